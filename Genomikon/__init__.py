@@ -4,9 +4,22 @@ from .algorithm import *
 from .callbacks import *
 from .core import *
 from .crossover import *
+from .distributed import *
+from .engines import *
+from .evaluators import *
 from .genome import *
+from .history import *
+from .local_search import *
 from .metrics import *
+from .multiobjective import *
+from .multifidelity import *
 from .mutation import *
+from .novelty import *
+from .operator_selection import *
 from .parent_selection import *
+from .restarts import *
+from .steady_state import *
+from .surrogate import *
 from .survivor_selection import *
+from .tuning import *
 from .validators import *
\ No newline at end of file
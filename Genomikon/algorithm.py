@@ -1,7 +1,9 @@
 """ Algorithm class which executes the genetic algorithm"""
+from concurrent.futures import ThreadPoolExecutor
 from .callbacks import BaseCallback
 from .core import *
-from .genome import AbstractGenome
+from .genome import AbstractGenome, as_fitness, fitness_array, fitness_key, get_fidelity
+from .validators import ValidationPolicy, get_validation
 from .parent_selection import Selector
 from .survivor_selection import SurvivorSelector
 from .metrics import max_fitness
@@ -9,91 +11,260 @@ from .metrics import max_fitness
 # Workaround
 import Genomikon.core as core
 
-__all__ = ['Algorithm']
+__all__ = ['GenerationRecord', 'Algorithm', 'run_concurrently']
+
+GenerationRecord = namedtuple("GenerationRecord", ["generation", "best", "fitness", "metrics"])
 
 class Algorithm:
     def __init__(self, population: List[AbstractGenome], parent_selector: Selector,
                 survivor_selector: SurvivorSelector, metrics:Collection[Callable]=[],
-                callbacks:Collection[BaseCallback]=[]):
+                callbacks:Collection[BaseCallback]=[], evaluator: Callable=None,
+                validation: ValidationPolicy=None):
         assert len(population) > 0
-        """Class that runs the algoritm with given population"""
+        """Class that runs the algoritm with given population
+        @param evaluator Callable that receives a list of genomes (and optionally a fidelity) and sets
+            their fitness, defaults to the evaluate_batch operator of the genome type,
+            its `metrics` list (if any) is added to the metrics
+        @param validation ValidationPolicy used during the generations, defaults to the global one
+        """
         self.__genome_type__ = population[0].__class__
+        self.evaluator = ifnone(evaluator, self.__genome_type__.evaluate_batch)
+        self.validation = validation
 
         self.n = len(population)
         self.population = [x for x in population]
-        for i in range(len(population)): self.population[i].evaluate()
+        self.evaluator(self.population)
         self.initialPopulation = [x.copy() for x in population]
         self.bests = []
 
         self.parentSelector = parent_selector
         self.survivorSelector = survivor_selector
-        self.numParents = population[0]._crossFunc.num_parents
-        self.numChildren = population[0]._crossFunc.num_children
+        # Engines that breed on their own (see engines.py) do not need cross or mutate operators
+        cross = getattr(self.__genome_type__, "_crossFunc", None)
+        mutator = getattr(self.__genome_type__, "_mutateFunc", None)
+        self.numParents = getattr(cross, "num_parents", 2)
+        self.numChildren = getattr(cross, "num_children", 2)
+        # Operators working over matrices of values are used when available
+        self._batchCross = hasattr(cross, "cross_batch") and self.numParents == 2 and self.numChildren == 2
+        self._batchMutate = hasattr(mutator, "mutate_batch")
         self.metrics = [max_fitness] + list(metrics)
         self.callbacks = sorted([C(self) for C in callbacks], key= lambda x: x.order)
+        for C in self.callbacks: self.metrics += list(getattr(C, "metrics", []))
+        self.metrics += list(getattr(self.evaluator, "metrics", []))
+
+    def get_callback(self, cb_type: type):
+        """Returns the first callback which is an instance of cb_type"""
+        return next((C for C in self.callbacks if isinstance(C, cb_type)), None)
 
     def fit(self, max_generations: int):
         """Alias for .run()"""
         return self.run(max_generations)
     
-    def simulate(self, max_generations: int, iterations: int=1):
-        """Runs for max_generations, ´iterations´ times and returns the best result"""
-        for _ in range(iterations):
-            self.run(max_generations)
-        return max(self.bests, key=lambda x: x.fitness)
+    def simulate(self, max_generations: int, iterations: int=1, restart: Callable=None):
+        """Runs for max_generations, ´iterations´ times and returns the best result
+        @param restart RestartStrategy that builds the starting population of every run after the first,
+            by default every run starts from the initial population
+        """
+        try:
+            for it in range(iterations):
+                if restart is not None and it > 0:
+                    self.seed(restart(self, it))
+                self.run(max_generations)
+        finally:
+            # Plain callables may be used as restart strategies too
+            if hasattr(restart, "end"): restart.end(self)
+        return max(self.bests, key=fitness_key)
 
-    def run(self, max_generations: int):
+    def seed(self, population: List[AbstractGenome]):
+        """Sets the population the next runs start from, genomes without fitness are evaluated"""
+        assert len(population) > 0
+        missing = [x for x in population if not hasattr(x, "fitness")]
+        if missing: self.evaluator(missing)
+        self.n = len(population)
+        self.initialPopulation = [x.copy() for x in population]
+
+    def random_genomes(self, n: int) -> List[AbstractGenome]:
+        """n new random (evaluated) genomes, drawn with the arguments of the generator"""
+        if n <= 0: return []
+        cls = self.__genome_type__
+        args, kwargs = cls._generatorArgs
+        population = cls.random_batch(n, *args, **kwargs)
+        self.evaluator(population)
+        return population
+
+    def set_objective(self, objective: Callable=None, batch_objective: Callable=None,
+                      evaluator: Callable=None, inject: float=0.0):
+        """Swaps the objective of a live algorithm, or rescores it after the data of the objective changed.
+        The current population and the previous bests are reevaluated in bulk, the population
+        becomes the starting population of the next runs and callbacks get on_objective_change
+        @param objective New objective value -> fitness, None keeps the current one.
+            A batched objective set before is removed unless batch_objective is given too
+        @param batch_objective New batched objective (see evaluate_batch), None keeps the current one
+        @param evaluator New evaluator, None keeps the current one. Custom evaluators hold their own
+            objective, so with one of them a new objective requires a new evaluator
+        @param inject Fraction of the worst genomes replaced by new random genomes
+        """
+        cls = self.__genome_type__
+        new_objective = objective is not None or batch_objective is not None
+        if new_objective and evaluator is None and self.evaluator != cls.evaluate_batch:
+            raise ValueError("The evaluator of the algorithm keeps the previous objective, pass a new evaluator")
+        if objective is not None:
+            cls._evaluateFunc = objective
+            # evaluate_batch prefers the batched objective, which would still be the old one
+            if batch_objective is None and hasattr(cls, "_evaluate_batchFunc"): del cls._evaluate_batchFunc
+        if batch_objective is not None: cls._evaluate_batchFunc = batch_objective
+        if evaluator is not None: self.evaluator = evaluator
+        self.evaluator(list({id(x): x for x in self.population + self.bests}.values()))
+        population = sorted(self.population, key=fitness_key, reverse=True)
+        n_new = min(len(population), int(round(inject*len(population))))
+        population = population[:len(population)-n_new] + self.random_genomes(n_new)
+        self.population = population
+        self.seed(population)
+        for C in self.callbacks: C.on_objective_change()
+
+    def save_population(self, file_name: PathOrStr):
+        """Saves the values and fitness of the current population in a .npz file"""
+        np.savez(file_name, values=self.__genome_type__.as_matrix(self.population),
+                 fitness=fitness_array(self.population))
+
+    def load_population(self, file_name: PathOrStr, reevaluate: bool=True) -> List[AbstractGenome]:
+        """Returns the population saved with save_population,
+        its fitness is recomputed unless reevaluate is False
+        """
+        with np.load(file_name) as data:
+            population = self.__genome_type__.from_matrix(data["values"])
+            if reevaluate:
+                self.evaluator(population)
+            else:
+                for x, f in zip(population, data["fitness"]): x.fitness = as_fitness(f)
+        return population
+
+    def _select_parents(self) -> List[int]:
+        parents_idxs = self.parentSelector(self.population)
+        random.shuffle(parents_idxs)
+        return parents_idxs
+
+    def _cross(self, parents_idxs: List[int]) -> List[AbstractGenome]:
+        """Crosses consecutive parents, children remember the indexes of their parents"""
+        cls = self.__genome_type__
+        if self._batchCross:
+            pairs = np.array(list(chunks(list(parents_idxs), 2, True)))
+            values = cls.as_matrix(self.population)
+            C, D = cls._crossFunc.batch(values[pairs[:, 0]], values[pairs[:, 1]])
+            children = cls.from_matrix(np.concatenate((C, D)))
+            for x, p in zip(children, np.concatenate((pairs, pairs))):
+                x._parents = list(p)
+                # Fitness of the best parent, used by mutators that receive credit (see operator_selection)
+                x._parentFitness = max((self.population[i] for i in p), key=fitness_key).fitness
+            return children
+        children = []
+        for p in chunks(parents_idxs, self.numParents, True):
+            brood = self.population[p[0]].cross(*[self.population[idx] for idx in p[1:]])
+            parent_fitness = max((self.population[i] for i in p), key=fitness_key).fitness
+            for x in brood:
+                x._parents = p
+                x._parentFitness = parent_fitness
+            children += brood
+        return children
+
+    def _mutate(self, children: List[AbstractGenome]):
+        cls = self.__genome_type__
+        if self._batchMutate and children:
+            values = cls._mutateFunc.mutate_batch(cls.as_matrix(children))
+            for x, val in zip(children, values): x.value = val
+            return
+        for x in children: x.mutate()
+
+    def _select_survivors(self) -> Tuple[List[int], List[int]]:
+        """Indexes of the surviving parents and children"""
+        return self.survivorSelector(self.population, self.children)
+
+    def _check(self, children: List[AbstractGenome]):
+        """Fatal checks of the children according to the validation policy"""
+        policy = get_validation()
+        if policy.mode == "off" or not children: return
+        if policy.mode == "sampled":
+            children = [x for x, s in zip(children, random.random(len(children)) < policy.fraction) if s]
+        self.__genome_type__.check_batch(children)
+
+    def _record(self, gen_timer: float):
+        """Keeps the best genome and the metrics of the current population"""
+        self.bests.append(max(self.population, key=fitness_key))
+        self.metrics_record.append({m.__name__:m(self.population) for m in self.metrics})
+        self.metrics_record[-1]["time"] = time.perf_counter() - gen_timer
+
+    def _generation(self, gen: int, max_generations: int):
+        """Runs generation number gen"""
+        with core.set_context(MAX_GENERATIONS=max_generations, GENERATION=gen,
+                              VALIDATION=ifnone(self.validation, get_validation())):
+            gen_timer = time.perf_counter()
+            # Callbacks
+            for C in self.callbacks: C.on_generation_begin()
+
+            ## Select indexes of parents
+            # Callbacks
+            for C in self.callbacks: C.on_selection_begin()
+            parents_idxs = self._select_parents()
+
+            ## Generate child by crossing
+            # Callbacks
+            for C in self.callbacks: C.on_crossover_begin()
+            self.children = self._cross(parents_idxs)
+
+            ## Mutate and validate children
+            # Callbacks
+            for C in self.callbacks: C.on_mutation_begin()
+            self._mutate(self.children)
+            self.__genome_type__.validate_batch(self.children)
+            self._check(self.children)
+
+            ## Evaluate
+            # Callbacks
+            for C in self.callbacks: C.on_evaluation_begin()
+            self.evaluator(self.children)
+
+            ## Select survivors
+            # Callbacks
+            for C in self.callbacks: C.on_survivor_begin()
+            if len({get_fidelity(x) for x in self.population + self.children}) > 1:
+                raise ValueError("Survivor selection over fitnesses computed at different fidelities")
+            pidx, chidx = self._select_survivors()
+            self.survivors = (pidx, chidx)
+            self.population = [self.population[i] for i in pidx] + [self.children[i] for i in chidx]
+
+            self._record(gen_timer)
+
+            # Callbacks
+            for C in self.callbacks: C.on_generation_end()
+
+    def iterate(self, max_generations: int) -> Iterator[GenerationRecord]:
+        """Lazy version of run, executes one generation per step and yields its GenerationRecord
+        The record references the best genome and the metrics row, nothing is copied.
+        on_run_end is called when the iteration finishes or the generator is closed. A break
+        only closes it once the generator is garbage collected, so callers that stop early
+        should close it themselves, e.g. `with contextlib.closing(algorithm.iterate(n)) as it:`
+        """
         self.population = [x.copy() for x in self.initialPopulation]
         self.metrics_record = []
+        self.maxGenerations = max_generations
         # Callbacks
         for C in self.callbacks: C.on_run_begin()
-        for gen in range(max_generations):
-            with core.set_context(MAX_GENERATIONS=max_generations, GENERATION=gen):
-                gen_timer = time.perf_counter()
-                # Callbacks
-                for C in self.callbacks: C.on_generation_begin()
-
-                ## Select indexes of parents
-                # Callbacks
-                for C in self.callbacks: C.on_selection_begin()
-                parents_idxs = self.parentSelector(self.population)
-                random.shuffle(parents_idxs)
-
-                ## Generate child by crossing
-                # Callbacks
-                for C in self.callbacks: C.on_crossover_begin()
-                children = []
-                for p in chunks(parents_idxs, self.numParents, True):
-                    children += self.population[p[0]].cross(*[self.population[idx] for idx in p[1:]])
-
-                ## Mutate and validate children
-                # Callbacks
-                for C in self.callbacks: C.on_mutation_begin()
-                for i in range(len(children)):
-                    children[i].mutate().validate()
-                
-                ## Evaluate
-                # Callbacks
-                for C in self.callbacks: C.on_evaluation_begin()
-                for i in range(len(children)):
-                    children[i].evaluate()                
-
-                ## Select survivors
-                # Callbacks
-                for C in self.callbacks: C.on_survivor_begin()
-                pidx, chidx = self.survivorSelector(self.population, children)
-                self.population = [self.population[i] for i in pidx] + [children[i] for i in chidx]
-
-                self.bests.append(max(self.population, key=lambda x: x.fitness))
-                
-                ## Metrics
-                self.metrics_record.append({m.__name__:m(self.population) for m in self.metrics})
-                self.metrics_record[-1]["time"] = time.perf_counter() - gen_timer
-                
-
-                # Callbacks
-                for C in self.callbacks: C.on_generation_end()
-        # Callbacks
-        for C in self.callbacks: C.on_run_end()
+        try:
+            for gen in range(max_generations):
+                self._generation(gen, max_generations)
+                yield GenerationRecord(gen, self.bests[-1], self.bests[-1].fitness, self.metrics_record[-1])
+        finally:
+            # Callbacks
+            for C in self.callbacks: C.on_run_end()
+
+    def run(self, max_generations: int):
+        for _ in self.iterate(max_generations): pass
+        return max(self.bests, key=fitness_key)
 
-        return max(self.bests, key=lambda x: x.fitness)
+def run_concurrently(algorithms: Collection[Algorithm], max_generations: int,
+                     max_workers: int = None) -> List[AbstractGenome]:
+    """Runs every algorithm for max_generations in a thread pool and returns their results in order
+    Each thread has its own context, so algorithms do not see each other's generation
+    """
+    with ThreadPoolExecutor(ifnone(max_workers, num_cpus())) as executor:
+        return list(executor.map(lambda A: A.run(max_generations), algorithms))
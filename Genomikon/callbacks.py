@@ -7,7 +7,10 @@ import Genomikon.core as core
 __all__ = ["BaseCallback", "CSVLogger"]
 
 class BaseCallback():
-    "Base class for callbacks"
+    """Base class for callbacks
+    Callbacks may modify the state of the algorithm (e.g. algorithm.children)
+    and may define a `metrics` list of functions which are added to the algorithm metrics
+    """
     order = 0
     def __init__(self, algorithm):
         self.algorithm = algorithm
@@ -39,6 +42,9 @@ class BaseCallback():
     def on_run_end(self):
         """Useful for cleaning up things"""
         pass
+    def on_objective_change(self):
+        """After Algorithm.set_objective rescored the population, to drop stale state"""
+        pass
 
     def  __repr__(self):
         attrs = func_args(self.__init__)
@@ -51,8 +57,8 @@ class CSVLogger(BaseCallback):
     def __init__(self, algorithm, file_name: PathOrStr = "log.csv"):
         self.algorithm = algorithm
         self.file_name = file_name
-        self.fieldnames = ["Generation"] + [x.__name__ for x in self.algorithm.metrics] + ["time"]
     def on_run_begin(self):
+        self.fieldnames = ["Generation"] + [x.__name__ for x in self.algorithm.metrics] + ["time"]
         with open(self.file_name, 'w', newline='') as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=self.fieldnames)
             writer.writeheader()
@@ -60,5 +66,5 @@ class CSVLogger(BaseCallback):
         with open(self.file_name, 'a', newline='') as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=self.fieldnames)
             row = self.algorithm.metrics_record[-1]
-            row.update({"Generation": core.CTX["GENERATION"]})
+            row.update({"Generation": core.get_context()["GENERATION"]})
             writer.writerow(row)
\ No newline at end of file
@@ -1,4 +1,5 @@
 import sys, os, shutil, gc, subprocess, inspect, time
+import contextvars
 import csv, gzip, json, io, pickle
 from collections import Counter, defaultdict, namedtuple, OrderedDict
 from collections.abc import Iterable
@@ -64,17 +65,28 @@ def delegates(to=None, keep=False):
         return f
     return _f
 
-CTX = dict()
+_CTX = contextvars.ContextVar("Genomikon_context", default=dict())
 
 @contextmanager
 def set_context(**kwargs):
-    """ Set a dict CTX containing information that can be used by functions called inside enclosure"""
-    global CTX
-    CTX = dict(**kwargs)
+    """ Set a dict containing information that can be used by functions called inside enclosure
+        The context is local to each thread (and contextvars context), read it with get_context()
+    """
+    token = _CTX.set(dict(**kwargs))
     try:
         yield
     finally:
-        pass
+        _CTX.reset(token)
+
+def get_context() -> dict:
+    """ Returns the dict set by the innermost set_context of the current thread"""
+    return _CTX.get()
+
+def __getattr__(name: str):
+    # core.CTX is kept as an alias of get_context()
+    if name == "CTX":
+        return get_context()
+    raise AttributeError(f"module {__name__} has no attribute {name}")
 
 def chunks(l: Collection, n: int, reflect: bool = False)->Iterable:
     "Yield successive `n`-sized chunks from `l`."
@@ -2,13 +2,15 @@
 Crossover operators are defined here.
 A Cross is a callable that accepts a number of parents (defined in his num_parents var)
 and return a list of its generated offspring (defined in his num_children var)
+Two parent, two children crosses may define cross_batch, which receives the values of all the
+pairs as two (n_pairs, dim) matrices and returns the two children matrices
 """
 from .core import *
 from .genome import *
 from .utils import random_range_bounds
 
 __all__ = ['Cross', 'NoCross', 'BinaryUniformCross', 'BinaryOnePointCross','BinaryTwoPointCross',
-        'FloatOnePointCross', 'FloatUniformCross', 'FloatMiddleCross', 'FloatSimulatedBinaryCross', 'FloatRecombinationCross', 'FloatHeuristicCross', 'PermutationOrderCross', 'PermutationPartiallyMappedCross', 'PermutationPositionBasedCross', 'PermutationOrderBasedCross']
+        'FloatOnePointCross', 'FloatUniformCross', 'FloatMiddleCross', 'FloatSimulatedBinaryCross', 'FloatRecombinationCross', 'FloatHeuristicCross', 'FloatAverageCross', 'PermutationOrderCross', 'PermutationPartiallyMappedCross', 'PermutationPositionBasedCross', 'PermutationOrderBasedCross', 'PermutationEdgeRecombinationCross', 'PermutationEdgeAssemblyCross']
 
 class Cross:
     """ Base class for all types of cross
@@ -24,6 +26,14 @@ class Cross:
             return [x.copy() for x in args]
         return self.cross(*args)
 
+    def batch(self, A: np.ndarray, B: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Crosses every pair of rows (A[i], B[i]) with the cross probability using cross_batch"""
+        crossed = random.random(len(A)) <= self._prob
+        C, D = A.copy(), B.copy()
+        if crossed.any():
+            C[crossed], D[crossed] = self.cross_batch(A[crossed], B[crossed])
+        return C, D
+
 class NoCross(Cross):
     def cross(self, A, B):
         return [A,B]
@@ -66,19 +76,27 @@ class FloatOnePointCross(Cross):
     def cross(self, A, B):
         cls = A.__class__
         pos = random.randint(0, len(A.value))
-        C = cls(np.concatenate(A.value[:pos], B.value[pos:]))
-        D = cls(np.concatenate(B.value[:pos], A.value[pos:]))
+        C = cls(np.concatenate((A.value[:pos], B.value[pos:])))
+        D = cls(np.concatenate((B.value[:pos], A.value[pos:])))
         return [C, D]
 
+    def cross_batch(self, A: np.ndarray, B: np.ndarray):
+        S = np.arange(A.shape[1]) < random.randint(0, A.shape[1], size=(len(A), 1))
+        return np.where(S, A, B), np.where(S, B, A)
+
 class FloatUniformCross(Cross):
     genome_type = FloatGenome
     def cross(self, A, B):
         cls = A.__class__
         S = random.randint(0,2, len(A.value)).astype(bool)
-        C = cls(np.array([A.value[it] if val else B.value[it] for it,val in enumerate(S)]))
-        D = cls(np.array([B.value[it] if val else A.value[it] for it,val in enumerate(S)]))
+        C = cls(np.where(S, A.value, B.value))
+        D = cls(np.where(S, B.value, A.value))
         return [C,D]
 
+    def cross_batch(self, A: np.ndarray, B: np.ndarray):
+        S = random.random(A.shape) < 0.5
+        return np.where(S, A, B), np.where(S, B, A)
+
 class FloatMiddleCross(Cross):
     genome_type = FloatGenome
 
@@ -89,10 +107,10 @@ class FloatMiddleCross(Cross):
     def cross(self, A, B):
         cls = A.__class__
         pos = random.randint(0, len(A.value))
-        othA = A[:pos]*(1-self._alpha) + B[:pos]*self._alpha
-        othB = B[:pos]*(1-self._alpha) + A[:pos]*self._alpha
-        C = cls(np.concatenate(A.value[:pos], othA))
-        D = cls(np.concatenate(B.value[:pos], othB))
+        othA = A.value[pos:]*(1-self._alpha) + B.value[pos:]*self._alpha
+        othB = B.value[pos:]*(1-self._alpha) + A.value[pos:]*self._alpha
+        C = cls(np.concatenate((A.value[:pos], othA)))
+        D = cls(np.concatenate((B.value[:pos], othB)))
         return [C, D]
 
 class FloatSimulatedBinaryCross(Cross):
@@ -113,6 +131,13 @@ class FloatSimulatedBinaryCross(Cross):
         D = cls(0.5*(P + b*abs(M)))
         return [C,D]
 
+    def cross_batch(self, A: np.ndarray, B: np.ndarray):
+        """Same as cross with one spread factor per pair"""
+        u = random.random((len(A), 1))
+        b = np.where(u > 0.5, 1.0/(2*(1-u)), 2*u) ** (1.0/(self._eta+1))
+        P, M = A + B, b.astype(A.dtype)*np.abs(B - A)
+        return 0.5*(P - M), 0.5*(P + M)
+
 class FloatRecombinationCross(Cross):
     genome_type = FloatGenome
     def __init__(self, prob: float, num_pos:int=None):
@@ -128,8 +153,8 @@ class FloatRecombinationCross(Cross):
             num_pos = self._num_pos
         positions = list(random.permutation(n))[:num_pos]
         C, D = A.value.copy(), B.value.copy()
-        C[positions] = (A[positions] + B[positions])/2.0
-        D[positions] = (A[positions] + B[positions])/2.0
+        C[positions] = (A.value[positions] + B.value[positions])/2.0
+        D[positions] = (A.value[positions] + B.value[positions])/2.0
         return [cls(C), cls(D)]
 
 class FloatHeuristicCross(Cross):
@@ -137,9 +162,10 @@ class FloatHeuristicCross(Cross):
     num_children = 1
 
     def cross(self, A, B):
+        cls = A.__class__
         if A.fitness >= B.fitness:
-            return [A.value + random.random()*(A.value-B.value)]
-        return [B.value + random.random()*(B.value-A.value)]
+            return [cls(A.value + random.random()*(A.value-B.value))]
+        return [cls(B.value + random.random()*(B.value-A.value))]
 
 class FloatAverageCross(Cross):
     genome_type = FloatGenome
@@ -231,3 +257,158 @@ class PermutationOrderBasedCross(Cross):
                 P2[i] = B.value[posB[ib]]
                 ib += 1
         return [cls(P1), cls(P2)]
+
+def _adjacency_tables(A: np.ndarray, B: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Edge tables of the tours in the rows of A and B: the union of the neighbours of every city,
+    shape (rows, n, 4) with -1 on repeated neighbours, and a mask of the edges both tours share
+    """
+    r, n = A.shape
+    rows = np.arange(r)[:, None]
+    T = np.empty((r, n, 4), dtype=np.int64)
+    for k, P in enumerate((A, B)):
+        T[rows, P, 2*k] = np.roll(P, 1, axis=1)
+        T[rows, P, 2*k+1] = np.roll(P, -1, axis=1)
+    common = np.zeros(T.shape, dtype=bool)
+    for j in (2, 3):
+        match = T[:, :, j:j+1] == T[:, :, :2]
+        common[:, :, :2] |= match
+        T[:, :, j][match.any(axis=2)] = -1
+    return T, common
+
+class PermutationEdgeRecombinationCross(Cross):
+    """Edge recombination (ERX) with preference for shared edges: the child walks the edge table of
+    both parents, moving to the unvisited neighbour shared by both parents or else with the fewest
+    unvisited neighbours, a random unvisited city on dead ends.
+    The two children start at the first city of each parent.
+    The walk is done for every pair at once, one vectorized step per city
+    """
+    genome_type = PermutationGenome
+
+    def cross(self, A, B):
+        cls = A.__class__
+        C, D = self.cross_batch(np.array([A.value]), np.array([B.value]))
+        return [cls(C[0].tolist()), cls(D[0].tolist())]
+
+    def cross_batch(self, A: np.ndarray, B: np.ndarray):
+        r, n = A.shape
+        T, common = _adjacency_tables(A, B)
+        T, common = np.concatenate((T, T)), np.concatenate((common, common))
+        rows = np.arange(2*r)
+        alive = T >= 0
+        degree = alive.sum(axis=2)
+        visited = np.zeros((2*r, n), dtype=bool)
+        child = np.empty((2*r, n), dtype=A.dtype)
+        current = np.concatenate((A[:, 0], B[:, 0]))
+        for t in range(n):
+            child[:, t] = current
+            visited[rows, current] = True
+            if t == n - 1: break
+            # Unvisited neighbours of current forget it, empty slots point to current itself
+            cand = alive[rows, current]
+            nbs = np.where(cand, T[rows, current], current[:, None])
+            hit = (T[rows[:, None], nbs] == current[:, None, None]) & cand[:, :, None]
+            alive[rows[:, None], nbs] &= ~hit
+            degree[rows[:, None], nbs] -= hit.sum(axis=2)
+            # Shared edges first, then fewest remaining neighbours, ties broken at random
+            key = degree[rows[:, None], nbs] - 4*common[rows, current] + random.random(cand.shape)
+            key[~cand] = np.inf
+            nxt = nbs[rows, np.argmin(key, axis=1)]
+            dead = ~cand.any(axis=1)
+            if dead.any():
+                free = np.where(visited[dead], np.inf, random.random((dead.sum(), n)))
+                nxt[dead] = np.argmin(free, axis=1)
+            current = nxt
+        return child[:r], child[r:]
+
+def _tour_adjacency(tour: List[int]) -> List[List[int]]:
+    """[previous, next] city of every city of the tour"""
+    adj = [None]*len(tour)
+    for i, c in enumerate(tour):
+        adj[c] = [tour[i-1], tour[(i+1) % len(tour)]]
+    return adj
+
+class PermutationEdgeAssemblyCross(Cross):
+    """Edge assembly crossover (EAX) for the TSP, single AB-cycle strategy:
+    the child is parent A with the A edges of a random alternating cycle of A and B edges
+    replaced by its B edges, the resulting subtours are merged greedily (smallest first)
+    with the cheapest 2-edge exchange towards one of the nearest cities.
+    Needs the distance matrix, the children are A+B and B+A
+    @param data Distance matrix
+    @param neighbours Nearest cities searched when merging subtours
+    """
+    genome_type = PermutationGenome
+    def __init__(self, prob: float, data: np.ndarray, neighbours: int = 10):
+        self._prob = prob
+        self._data = np.asarray(data, dtype=float)
+        self._near = np.argsort(self._data, axis=1)[:, 1:neighbours+1].tolist()
+
+    def cross(self, A, B):
+        cls = A.__class__
+        a, b = [int(x) for x in A.value], [int(x) for x in B.value]
+        if len(a) < 5: return [A.copy(), B.copy()]
+        return [cls(self._assemble(a, b)), cls(self._assemble(b, a))]
+
+    def _ab_cycles(self, adjA: List[List[int]], adjB: List[List[int]]) -> List[List[Tuple[int, int]]]:
+        """Closed walks alternating A and B edges that are not shared, every edge is used once"""
+        remA = [[x for x in adjA[c] if x not in adjB[c]] for c in range(len(adjA))]
+        remB = [[x for x in adjB[c] if x not in adjA[c]] for c in range(len(adjB))]
+        cycles = []
+        for s in range(len(adjA)):
+            while remA[s]:
+                walk, cur, use_a = [], s, True
+                while True:
+                    rem = remA if use_a else remB
+                    nxt = rem[cur].pop(random.randint(len(rem[cur])))
+                    rem[nxt].remove(cur)
+                    walk.append((cur, nxt))
+                    cur, use_a = nxt, not use_a
+                    if cur == s and use_a: break
+                cycles.append(walk)
+        return cycles
+
+    def _assemble(self, a: List[int], b: List[int]) -> List[int]:
+        n, d = len(a), self._data
+        adj, adjB = _tour_adjacency(a), _tour_adjacency(b)
+        cycles = self._ab_cycles(adj, adjB)
+        if not cycles: return a
+        walk = cycles[random.randint(len(cycles))]
+        for u, v in walk[0::2]:
+            adj[u][adj[u].index(v)], adj[v][adj[v].index(u)] = -1, -1
+        for u, v in walk[1::2]:
+            adj[u][adj[u].index(-1)], adj[v][adj[v].index(-1)] = v, u
+        ## Label subtours
+        label, members = [-1]*n, []
+        for s in range(n):
+            if label[s] >= 0: continue
+            prev, cur, group = -1, s, []
+            while label[cur] < 0:
+                label[cur] = len(members)
+                group.append(cur)
+                prev, cur = cur, adj[cur][0] if adj[cur][0] != prev else adj[cur][1]
+            members.append(group)
+        active = set(range(len(members)))
+        ## Merge the smallest subtour into another one until a single tour is left
+        while len(active) > 1:
+            U = min(active, key=lambda k: len(members[k]))
+            best = None
+            for candidates in (self._near, None):
+                for u in members[U]:
+                    for v in (candidates[u] if candidates is not None else range(n)):
+                        if label[v] == U: continue
+                        for u1 in adj[u]:
+                            for v1 in adj[v]:
+                                delta = d[u, v] + d[u1, v1] - d[u, u1] - d[v, v1]
+                                if best is None or delta < best[0]: best = (delta, u, u1, v, v1)
+                if best is not None: break
+            _, u, u1, v, v1 = best
+            adj[u][adj[u].index(u1)], adj[u1][adj[u1].index(u)] = v, v1
+            adj[v][adj[v].index(v1)], adj[v1][adj[v1].index(v)] = u, u1
+            V = label[v]
+            for c in members[U]: label[c] = V
+            members[V] += members[U]
+            active.remove(U)
+        tour, prev, cur = [a[0]], -1, a[0]
+        for _ in range(n-1):
+            prev, cur = cur, adj[cur][0] if adj[cur][0] != prev else adj[cur][1]
+            tour.append(cur)
+        return tour
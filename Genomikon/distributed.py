@@ -0,0 +1,157 @@
+"""
+Distributed evaluation over sockets
+A BrokerEvaluator listens on a TCP or Unix socket address, workers started anywhere with run_worker
+connect to it, receive batches of genome values and send back their fitnesses
+"""
+from multiprocessing.connection import Connection, Listener, Client, wait
+from multiprocessing import AuthenticationError
+import multiprocessing as mp
+import queue
+import threading
+from .core import *
+from .genome import AbstractGenome, as_fitness
+
+__all__ = ["BrokerEvaluator", "run_worker", "start_local_workers"]
+
+# (host, port) tuple or Unix socket path
+Address = Union[Tuple[str, int], str]
+
+def run_worker(address: Address, objective: Callable, authkey: bytes = b"Genomikon"):
+    """Connects to the broker at address and evaluates the batches it sends until it is closed
+    @param address (host, port) tuple or Unix socket path of the broker
+    """
+    with Client(address, authkey=authkey) as conn:
+        conn.send(("register", os.getpid()))
+        while True:
+            try:
+                task = conn.recv()
+            except EOFError:
+                return
+            if task is None: return
+            batch_id, values, fidelity = task
+            kwargs = dict() if fidelity is None else dict(fidelity=fidelity)
+            try:
+                conn.send((batch_id, True, [objective(v, **kwargs) for v in values]))
+            except Exception as e:
+                conn.send((batch_id, False, repr(e)))
+
+def start_local_workers(address: Address, objective: Callable, n: int, authkey: bytes = b"Genomikon") -> List:
+    """Starts n run_worker processes on this machine, returns the processes"""
+    workers = [mp.Process(target=run_worker, args=(address, objective, authkey), daemon=True) for _ in range(n)]
+    for w in workers: w.start()
+    return workers
+
+class BrokerEvaluator:
+    """Evaluator that farms batches of genome values out to the workers connected to it.
+    Every worker holds at most `max_in_flight` batches (backpressure), the batches of a worker
+    that disconnects are queued again for the others. Workers may join at any moment.
+    An exception raised by the objective on a worker is raised again as a RuntimeError,
+    so is waiting longer than `timeout` without any connected worker.
+    Adds the connected_workers and requeued_batches metrics
+    @param address (host, port) tuple or Unix socket path, port 0 picks a free port (see .address)
+    @param batch_size Genomes sent per message
+    @param max_in_flight Batches sent to a worker before its results arrive
+    @param poll Seconds between checks for new workers while waiting
+    @param timeout Seconds a call waits while no worker is connected, None waits forever
+    """
+    def __init__(self, address: Address = ("localhost", 0), authkey: bytes = b"Genomikon", batch_size: int = 16,
+                 max_in_flight: int = 2, poll: float = 0.05, timeout: float = 30.0):
+        self.batchSize = batch_size
+        self.maxInFlight = max_in_flight
+        self.poll = poll
+        self.timeout = timeout
+        self.requeued = 0
+        self.metrics = [self.connected_workers, self.requeued_batches]
+        self._listener = Listener(address, authkey=authkey)
+        self._joining = queue.Queue()
+        self._workers = dict() # connection -> ids of the batches in flight
+        self._nextId = 0 # Batch ids are unique across calls, replies to earlier calls are dropped
+        self._closed = False
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    @property
+    def address(self):
+        return self._listener.address
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+                conn.recv()
+            except (OSError, EOFError, AuthenticationError):
+                # Failed handshakes (e.g. a wrong authkey) must not stop accepting workers
+                continue
+            self._joining.put(conn)
+
+    def _drop(self, conn: Connection, pending: List[int], batches: Dict[int, List[int]]):
+        """Forgets a disconnected worker and queues its batches of the current call again"""
+        lost = [b for b in self._workers.pop(conn) if b in batches]
+        self.requeued += len(lost)
+        pending.extend(lost)
+        conn.close()
+
+    def __call__(self, population: List[AbstractGenome], fidelity: float = None):
+        batches = {self._nextId + k: list(range(i, min(len(population), i+self.batchSize)))
+                   for k, i in enumerate(range(0, len(population), self.batchSize))}
+        self._nextId += len(batches)
+        pending, done = sorted(batches, reverse=True), 0
+        alone = time.perf_counter() # Last moment a worker was connected
+        while done < len(batches):
+            while not self._joining.empty(): self._workers[self._joining.get()] = []
+            if self._workers:
+                alone = time.perf_counter()
+            elif self.timeout is not None and time.perf_counter() - alone > self.timeout:
+                raise RuntimeError(f"No worker connected to {self.address} for {self.timeout} seconds")
+            ## Fill every worker up to max_in_flight
+            for conn, flying in list(self._workers.items()):
+                while pending and len(flying) < self.maxInFlight:
+                    batch_id = pending.pop()
+                    try:
+                        conn.send((batch_id, [population[i].value for i in batches[batch_id]], fidelity))
+                    except OSError:
+                        pending.append(batch_id)
+                        self._drop(conn, pending, batches)
+                        break
+                    flying.append(batch_id)
+            for conn in wait(list(self._workers), timeout=self.poll):
+                try:
+                    batch_id, ok, result = conn.recv()
+                except (EOFError, OSError):
+                    self._drop(conn, pending, batches)
+                    continue
+                if batch_id in self._workers[conn]: self._workers[conn].remove(batch_id)
+                if batch_id not in batches: continue
+                if not ok:
+                    raise RuntimeError(f"Objective failed on a worker: {result}")
+                for i, f in zip(batches[batch_id], result):
+                    population[i].fitness, population[i].fidelity = as_fitness(f), fidelity
+                done += 1
+
+    def connected_workers(self, population: List[AbstractGenome]) -> int:
+        return len(self._workers) + self._joining.qsize()
+
+    def requeued_batches(self, population: List[AbstractGenome]) -> int:
+        return self.requeued
+
+    def close(self):
+        """Stops the workers and the listener"""
+        if self._closed: return
+        self._closed = True
+        while not self._joining.empty(): self._workers[self._joining.get()] = []
+        for conn in self._workers:
+            try:
+                conn.send(None)
+            except OSError:
+                pass
+            conn.close()
+        self._workers = dict()
+        self._listener.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close()
@@ -0,0 +1,178 @@
+"""
+Engines for FloatGenome that breed over the population matrix instead of using cross and mutate operators
+They are drop-in replacements of Algorithm: same population, objective, evaluator, validators,
+metrics and callbacks, only the parent selection, breeding and survivor selection steps change
+"""
+from .algorithm import Algorithm
+from .callbacks import BaseCallback
+from .core import *
+from .genome import AbstractGenome, fitness_key
+from .validators import ValidationPolicy
+
+__all__ = ["DifferentialEvolution", "CMAES"]
+
+def _ranked(genomes: List[AbstractGenome]) -> List[int]:
+    """Indexes of genomes from best to worst"""
+    return sorted(range(len(genomes)), key=lambda i: fitness_key(genomes[i]), reverse=True)
+
+class DifferentialEvolution(Algorithm):
+    """Differential evolution: every genome is the target of one trial vector, made with the
+    differential mutation of `strategy` and binomial crossover, the trial replaces its target
+    when its fitness is not worse. Children remember (target, r1, r2, r3) as their parents
+    @param strategy "rand/1/bin" or "current-to-best/1/bin", the latter is greedier
+        and may stagnate with small F (0.8 is safer)
+    @param F Differential weight
+    @param CR Crossover rate
+    """
+    def __init__(self, population: List[AbstractGenome], strategy: str = "rand/1/bin", F: float = 0.5,
+                 CR: float = 0.9, metrics: Collection[Callable] = [], callbacks: Collection[BaseCallback] = [],
+                 evaluator: Callable = None, validation: ValidationPolicy = None):
+        assert strategy in ("rand/1/bin", "current-to-best/1/bin")
+        assert len(population) >= 4
+        super().__init__(population, None, None, metrics, callbacks, evaluator, validation)
+        self.strategy = strategy
+        self.F = F
+        self.CR = CR
+        self.numParents, self.numChildren = 4, 1
+
+    def _select_parents(self) -> np.ndarray:
+        """Rows (target, r1, r2, r3) of distinct indexes, every genome is a target once"""
+        n = len(self.population)
+        P = np.empty((n, 4), dtype=np.int64)
+        P[:, 0] = np.arange(n)
+        for k in range(1, 4):
+            P[:, k] = random.randint(0, n, size=n)
+            clash = (P[:, k:k+1] == P[:, :k]).any(axis=1)
+            while clash.any():
+                P[clash, k] = random.randint(0, n, size=clash.sum())
+                clash = (P[:, k:k+1] == P[:, :k]).any(axis=1)
+        return P
+
+    def _cross(self, P: np.ndarray) -> List[AbstractGenome]:
+        cls = self.__genome_type__
+        X = cls.as_matrix(self.population)
+        if self.strategy == "rand/1/bin":
+            V = X[P[:, 1]] + self.F*(X[P[:, 2]] - X[P[:, 3]])
+        else:
+            best = X[_ranked(self.population)[0]]
+            V = X + self.F*(best - X) + self.F*(X[P[:, 1]] - X[P[:, 2]])
+        mask = random.random(X.shape) < self.CR
+        mask[np.arange(len(X)), random.randint(0, X.shape[1], size=len(X))] = True
+        children = cls.from_matrix(np.where(mask, V, X).astype(X.dtype, copy=False))
+        for x, p in zip(children, P): x._parents = list(p)
+        return children
+
+    def _mutate(self, children: List[AbstractGenome]):
+        pass
+
+    def _select_survivors(self) -> Tuple[List[int], List[int]]:
+        """One to one replacement of every target by its trial"""
+        replaced = dict()
+        for j, x in enumerate(self.children):
+            i = getattr(x, "_parents", [None])[0]
+            if i is not None and fitness_key(x) >= fitness_key(self.population[i]): replaced[i] = j
+        return [i for i in range(len(self.population)) if i not in replaced], list(replaced.values())
+
+class CMAES(Algorithm):
+    """(mu/mu_w, lambda) covariance matrix adaptation evolution strategy.
+    Every generation `offspring` genomes are sampled from the search distribution and become the population,
+    the best `mu` of them update the mean, the covariance matrix and the step size.
+    Values clipped by a validator are used as sampled. The distribution starts at the mean of the
+    best half of the initial population, and is reset on every run. Adds the cma_sigma metric
+    @param sigma Initial step size, defaults to the mean standard deviation of the initial population
+    @param offspring Samples per generation, defaults to the population size
+    @param mu Genomes used in the update, defaults to offspring//2
+    Both keep their ratio to the population size when seed changes it (e.g. IPOPRestart)
+    """
+    def __init__(self, population: List[AbstractGenome], sigma: float = None, offspring: int = None,
+                 mu: int = None, metrics: Collection[Callable] = [], callbacks: Collection[BaseCallback] = [],
+                 evaluator: Callable = None, validation: ValidationPolicy = None):
+        super().__init__(population, None, None, metrics, callbacks, evaluator, validation)
+        self.sigma0 = sigma
+        self._sizes = (self.n, offspring, mu)
+        self._set_sizes()
+        self.numParents, self.numChildren = 1, 1
+        self.metrics.append(self.cma_sigma)
+
+    def _set_sizes(self):
+        """Scales offspring and mu with the current population size"""
+        n, offspring, mu = self._sizes
+        self.offspring = self.n if offspring is None else max(1, int(round(offspring*self.n/n)))
+        self.mu = self.offspring//2 if mu is None else int(round(mu*self.offspring/ifnone(offspring, n)))
+        assert 1 <= self.mu <= self.offspring
+
+    def seed(self, population: List[AbstractGenome]):
+        super().seed(population)
+        self._set_sizes()
+
+    def _reset(self):
+        """Initial state of the search distribution, its sizes and constants follow the population size"""
+        self._set_sizes()
+        X = self.__genome_type__.as_matrix(self.initialPopulation).astype(float)
+        ranked = _ranked(self.initialPopulation)
+        N = X.shape[1]
+        self.mean = X[ranked[:max(1, len(X)//2)]].mean(axis=0)
+        self.sigma = ifnone(self.sigma0, float(np.mean(np.std(X, axis=0))) or 1.0)
+        w = np.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self._weights = w/w.sum()
+        mueff = 1.0/np.sum(self._weights**2)
+        self._cc = (4 + mueff/N)/(N + 4 + 2*mueff/N)
+        self._cs = (mueff + 2)/(N + mueff + 5)
+        self._c1 = 2/((N + 1.3)**2 + mueff)
+        self._cmu = min(1 - self._c1, 2*(mueff - 2 + 1/mueff)/((N + 2)**2 + mueff))
+        self._damps = 1 + 2*max(0, np.sqrt((mueff - 1)/(N + 1)) - 1) + self._cs
+        self._chiN = np.sqrt(N)*(1 - 1/(4*N) + 1/(21*N**2))
+        self._C, self._B, self._D = np.eye(N), np.eye(N), np.ones(N)
+        self._pc, self._ps = np.zeros(N), np.zeros(N)
+        self._updates, self._eigenUpdate = 0, 0
+
+    def iterate(self, max_generations: int) -> Iterator:
+        self._reset()
+        yield from super().iterate(max_generations)
+
+    def _select_parents(self) -> List[int]:
+        return []
+
+    def _cross(self, parents_idxs: List[int]) -> List[AbstractGenome]:
+        """Samples the offspring from N(mean, sigma^2 C)"""
+        cls = self.__genome_type__
+        Z = random.standard_normal((self.offspring, len(self.mean)))
+        X = self.mean + self.sigma*((Z*self._D) @ self._B.T)
+        children = cls.from_matrix(X.astype(self.initialPopulation[0].value.dtype))
+        for x in children: x._parents = []
+        return children
+
+    def _mutate(self, children: List[AbstractGenome]):
+        pass
+
+    def _select_survivors(self) -> Tuple[List[int], List[int]]:
+        """Updates the distribution with the best children, which replace the population"""
+        ranked = _ranked(self.children)
+        if ranked: self._update(self.__genome_type__.as_matrix([self.children[i] for i in ranked[:self.mu]]))
+        return [], ranked
+
+    def _update(self, X: np.ndarray):
+        N = len(self.mean)
+        w = self._weights[:len(X)]/self._weights[:len(X)].sum()
+        mueff = 1.0/np.sum(w**2)
+        cc, cs, c1, cmu = self._cc, self._cs, self._c1, self._cmu
+        Y = (X.astype(float) - self.mean)/self.sigma
+        yw = w @ Y
+        self.mean = self.mean + self.sigma*yw
+        self._updates += 1
+        self._ps = (1 - cs)*self._ps + np.sqrt(cs*(2 - cs)*mueff)*(self._B @ ((self._B.T @ yw)/self._D))
+        ps_norm = np.linalg.norm(self._ps)
+        hsig = ps_norm/np.sqrt(1 - (1 - cs)**(2*self._updates))/self._chiN < 1.4 + 2/(N + 1)
+        self._pc = (1 - cc)*self._pc + hsig*np.sqrt(cc*(2 - cc)*mueff)*yw
+        self._C = ((1 - c1 - cmu)*self._C + c1*(np.outer(self._pc, self._pc) + (1 - hsig)*cc*(2 - cc)*self._C)
+                   + cmu*(Y.T*w) @ Y)
+        self.sigma *= np.exp((cs/self._damps)*(ps_norm/self._chiN - 1))
+        # The eigendecomposition is refreshed lazily, it costs O(N^3)
+        if self._updates - self._eigenUpdate > 1/(10*N*(c1 + cmu)):
+            self._eigenUpdate = self._updates
+            self._C = np.triu(self._C) + np.triu(self._C, 1).T
+            D2, self._B = np.linalg.eigh(self._C)
+            self._D = np.sqrt(np.maximum(D2, 1e-20))
+
+    def cma_sigma(self, population: List[AbstractGenome]) -> float:
+        return self.sigma
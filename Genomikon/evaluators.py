@@ -0,0 +1,240 @@
+"""
+Evaluators are defined here
+An evaluator is a callable that receives a list of genomes and sets their fitness,
+it can be passed to Algorithm to replace the default (serial) evaluation.
+Evaluators accept an optional fidelity: objectives are then called as objective(value, fidelity=fidelity)
+and the genomes are tagged with it (None is full fidelity), see multifidelity.py
+Evaluators that may be called from several threads at once set a truthy `reentrant` attribute,
+the ones here reuse their buffers and workers between calls so they are not (see steady_state.py)
+"""
+from multiprocessing import shared_memory
+import multiprocessing as mp
+import multiprocessing.connection
+from .core import *
+from .genome import AbstractGenome, as_fitness
+
+__all__ = ["SharedMemoryEvaluator", "TimeoutEvaluator"]
+
+## Shared memory evaluation
+# State of a worker process, filled by the pool initializer
+_WORKER = dict()
+
+def _attach(spec: Tuple[str, tuple, str]) -> np.ndarray:
+    """Returns an array backed by the shared memory block described by spec,
+    blocks are attached once per worker process
+    """
+    name, shape, dtype = spec
+    blocks = _WORKER.setdefault("blocks", dict())
+    if name not in blocks:
+        blocks[name] = shared_memory.SharedMemory(name=name)
+    return np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+
+def _init_worker(objective: Callable, shared_specs: Dict[str, Tuple[str, tuple, str]]):
+    _WORKER["objective"] = objective
+    _WORKER["shared"] = {k: _attach(spec) for k, spec in shared_specs.items()}
+
+def _evaluate_range(task: Tuple):
+    values_spec, fitness_spec, start, stop, fidelity = task
+    values, fitness = _attach(values_spec), _attach(fitness_spec)
+    objective, shared = _WORKER["objective"], dict(_WORKER["shared"])
+    if fidelity is not None: shared["fidelity"] = fidelity
+    for i in range(start, stop):
+        fitness[i] = objective(values[i], **shared)
+
+class SharedMemoryEvaluator:
+    """Evaluates genomes with fixed length numeric values (FloatGenome, PermutationGenome)
+    in a pool of worker processes without pickling them.
+    The values are copied once into a shared matrix, workers receive index ranges
+    and write the fitness directly into a shared buffer.
+    Keyword arrays (e.g. the TSP distance matrix) are shared once when the pool starts
+    and passed to the objective as keyword arguments: objective(value, **shared_data)
+    @param objective Objective function, must be picklable unless the start method is fork
+    @param workers Amount of processes, defaults to the number of cpus
+    @param num_objectives Length of the fitness vector, 1 means scalar fitness
+    @param chunks_per_worker Each evaluation is split in workers*chunks_per_worker ranges
+    """
+    def __init__(self, objective: Callable, workers: int = None, num_objectives: int = 1,
+                 chunks_per_worker: int = 4, **shared_data):
+        self.objective = objective
+        self.workers = ifnone(workers, num_cpus())
+        self.numObjectives = num_objectives
+        self.chunksPerWorker = chunks_per_worker
+        self._sharedData = {k: np.asarray(v) for k, v in shared_data.items()}
+        self._blocks = dict()
+        self._pool = None
+
+    def _share(self, key: str, shape: tuple, dtype: np.dtype) -> np.ndarray:
+        """Returns a shared array for key, the block is replaced if it is too small"""
+        dtype = np.dtype(dtype)
+        nbytes = max(1, int(np.prod(shape))*dtype.itemsize)
+        if key not in self._blocks or self._blocks[key].size < nbytes:
+            self._release(key)
+            self._blocks[key] = shared_memory.SharedMemory(create=True, size=nbytes)
+        return np.ndarray(shape, dtype=dtype, buffer=self._blocks[key].buf)
+
+    def _spec(self, key: str, array: np.ndarray) -> Tuple[str, tuple, str]:
+        return (self._blocks[key].name, array.shape, array.dtype.str)
+
+    def _release(self, key: str):
+        if key in self._blocks:
+            block = self._blocks.pop(key)
+            block.close()
+            # The resource tracker of the workers may have removed a replaced block already
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _start(self):
+        specs = dict()
+        for k, v in self._sharedData.items():
+            arr = self._share(f"data_{k}", v.shape, v.dtype)
+            arr[...] = v
+            specs[k] = self._spec(f"data_{k}", arr)
+        self._pool = mp.Pool(self.workers, initializer=_init_worker, initargs=(self.objective, specs))
+
+    def __call__(self, population: List[AbstractGenome], fidelity: float = None):
+        if self._pool is None:
+            self._start()
+        n = len(population)
+        matrix = population[0].__class__.as_matrix(population)
+        values = self._share("values", matrix.shape, matrix.dtype)
+        values[...] = matrix
+        fit_shape = (n,) if self.numObjectives == 1 else (n, self.numObjectives)
+        fitness = self._share("fitness", fit_shape, np.float64)
+        values_spec, fitness_spec = self._spec("values", values), self._spec("fitness", fitness)
+        step = max(1, -(-n // (self.workers*self.chunksPerWorker)))
+        tasks = [(values_spec, fitness_spec, i, min(n, i+step), fidelity) for i in range(0, n, step)]
+        self._pool.map(_evaluate_range, tasks)
+        for x, f in zip(population, fitness.copy()):
+            x.fitness = as_fitness(f) if self.numObjectives > 1 else float(f)
+            x.fidelity = fidelity
+
+    def close(self):
+        """Stops the workers and frees the shared memory"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        for key in list(self._blocks): self._release(key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+## Evaluation with timeouts
+def _timeout_worker(objective: Callable, conn: multiprocessing.connection.Connection):
+    """Loop of a TimeoutEvaluator worker, receives (index, value, fidelity) and answers (index, ok, result)"""
+    while True:
+        task = conn.recv()
+        if task is None: return
+        idx, value, fidelity = task
+        try:
+            result = objective(value) if fidelity is None else objective(value, fidelity=fidelity)
+            conn.send((idx, True, result))
+        except Exception as e:
+            conn.send((idx, False, repr(e)))
+
+class TimeoutEvaluator:
+    """Evaluates genomes in worker processes with a per evaluation timeout.
+    A genome whose evaluation times out, raises or kills its worker gets the penalty fitness
+    and the reason in genome.evaluationError. Hung or dead workers are killed and replaced
+    on their own, the other workers keep running.
+    Adds the evaluation_timeouts and evaluation_failures metrics (totals since creation)
+    @param objective Objective function, must be picklable unless the start method is fork
+    @param timeout Seconds an evaluation may take
+    @param penalty Fitness of genomes that could not be evaluated
+    @param workers Amount of processes, defaults to the number of cpus
+    """
+    def __init__(self, objective: Callable, timeout: float, penalty: float = -np.inf, workers: int = None):
+        self.objective = objective
+        self.timeout = timeout
+        self.penalty = penalty
+        self.workers = ifnone(workers, num_cpus())
+        self.timeouts, self.failures = 0, 0
+        self.metrics = [self.evaluation_timeouts, self.evaluation_failures]
+        self._workers = []
+
+    def _spawn(self) -> Tuple:
+        parent, child = mp.Pipe()
+        process = mp.Process(target=_timeout_worker, args=(self.objective, child), daemon=True)
+        process.start()
+        child.close()
+        return (process, parent)
+
+    def _recycle(self, slot: int):
+        process, conn = self._workers[slot]
+        process.kill()
+        process.join()
+        conn.close()
+        self._workers[slot] = self._spawn()
+
+    def _fail(self, genome: AbstractGenome, reason: str):
+        genome.fitness = self.penalty
+        genome.evaluationError = reason
+
+    def __call__(self, population: List[AbstractGenome], fidelity: float = None):
+        for x in population: x.fidelity = fidelity
+        while len(self._workers) < self.workers: self._workers.append(self._spawn())
+        pending = list(range(len(population)))[::-1]
+        running = dict() # slot -> (index, deadline)
+        while pending or running:
+            for slot in range(len(self._workers)):
+                if slot not in running and pending:
+                    idx = pending.pop()
+                    self._workers[slot][1].send((idx, population[idx].value, fidelity))
+                    running[slot] = (idx, time.monotonic() + self.timeout)
+            wait = max(0, min(deadline for _, deadline in running.values()) - time.monotonic())
+            handles = {self._workers[s][1]: s for s in running}
+            handles.update({self._workers[s][0].sentinel: s for s in running})
+            for ready in mp.connection.wait(list(handles), timeout=wait):
+                slot = handles[ready]
+                if slot not in running: continue
+                idx, _ = running.pop(slot)
+                try:
+                    _, ok, result = self._workers[slot][1].recv()
+                except (EOFError, OSError):
+                    self.failures += 1
+                    self._fail(population[idx], "worker died")
+                    self._recycle(slot)
+                    continue
+                if ok:
+                    population[idx].fitness = as_fitness(result)
+                else:
+                    self.failures += 1
+                    self._fail(population[idx], result)
+            now = time.monotonic()
+            for slot, (idx, deadline) in list(running.items()):
+                if now >= deadline:
+                    del running[slot]
+                    self.timeouts += 1
+                    self._fail(population[idx], "timeout")
+                    self._recycle(slot)
+
+    def evaluation_timeouts(self, population: List[AbstractGenome]) -> int:
+        return self.timeouts
+
+    def evaluation_failures(self, population: List[AbstractGenome]) -> int:
+        return self.failures
+
+    def close(self):
+        """Stops the workers"""
+        for process, conn in self._workers:
+            process.kill()
+            process.join()
+            conn.close()
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close()
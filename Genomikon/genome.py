@@ -2,10 +2,10 @@
 Implements a collection of genome types
 """
 from .core import *
-from .validators import is_permutation, GenValidationError
+from .validators import is_permutation, is_permutation_batch, check_on_build, to_bounds, Bounds, GenValidationError
 
-__all__ = ["genome_operator", "AbstractGenome", "GenomeType", "BinaryGenome",
-           "FloatGenome", "PermutationGenome"]
+__all__ = ["genome_operator", "fitness_key", "fitness_array", "get_fidelity", "AbstractGenome", "GenomeType",
+           "BinaryGenome", "FloatGenome", "PermutationGenome"]
 
 class GenomeGenerator:
     """ Proxy class that assigns operators to the genome type """
@@ -13,6 +13,8 @@ class GenomeGenerator:
         self.genomeType = copy_class(genome_type)
         self.genomeName = self.genomeType.__name__
         self._args, self._kwargs = args, kwargs
+        # Kept so new random genomes can be drawn later (e.g. on restarts)
+        self.genomeType._generatorArgs = (args, kwargs)
 
     def __getattr__(self, name):
         attr = getattr(self.genomeType, name)
@@ -30,10 +32,30 @@ class GenomeGenerator:
 
     def population(self, n: int):
         assert n > 0
-        population = [self.genomeType.random(*self._args, **self._kwargs) for _ in range(n)]
-        for i in range(n): population[i].evaluate()
+        population = self.genomeType.random_batch(n, *self._args, **self._kwargs)
+        self.genomeType.evaluate_batch(population)
         return population
 
+def fitness_key(genome: "AbstractGenome") -> Union[float, tuple]:
+    """Key used to find the best genome, vector fitnesses are compared lexicographically"""
+    if isinstance(genome.fitness, np.ndarray):
+        return tuple(genome.fitness)
+    return genome.fitness
+
+def fitness_array(population: List) -> np.ndarray:
+    """Returns the fitnesses of the population as an array of shape (n,) or (n, objectives)"""
+    return np.array([x.fitness for x in population], dtype=float)
+
+def get_fidelity(genome: "AbstractGenome") -> Union[float, None]:
+    """Fidelity the fitness of genome was computed at, None is full fidelity"""
+    return getattr(genome, "fidelity", None)
+
+def as_fitness(fitness: Union[float, Collection[float], np.ndarray]) -> Union[float, np.ndarray]:
+    """Sequences are stored as a vector fitness"""
+    if is_listy(fitness) or isinstance(fitness, np.ndarray):
+        return np.asarray(fitness, dtype=float)
+    return fitness
+
 def genome_operator(_f):
     """Decorates operators of a genome"""
     _f.__is_gop__ = True
@@ -46,7 +68,9 @@ class AbstractGenome():
     
     def __repr__(self):
         res = f'<{self.__class__.__name__}: value={str(self.value)}'
-        if hasattr(self, "fitness"):
+        if hasattr(self, "fitness") and isinstance(self.fitness, np.ndarray):
+            res += f' fitness={self.fitness}'
+        elif hasattr(self, "fitness"):
             res += f' fitness={self.fitness:.4f}'
         return res +'>'
 
@@ -62,6 +86,9 @@ class AbstractGenome():
         new_args = {k: deepcopy(getattr(self, k)) for k in self._copyNew}
         New = cls(**new_args)
         if hasattr(self, "fitness"): New.fitness = deepcopy(self.fitness)
+        if hasattr(self, "fidelity"): New.fidelity = self.fidelity
+        # Raw objective of genomes whose fitness was replaced (see NoveltySearch)
+        if hasattr(self, "objective"): New.objective = deepcopy(self.objective)
         return New
 
     def __add__(self, others):
@@ -76,8 +103,14 @@ class AbstractGenome():
 
     @genome_operator
     def mutate(self):
-        """ Perform Mutation"""
-        self.value = self.__class__._mutateFunc(self.value)
+        """ Perform Mutation
+            Mutators defining mutate_genome receive the whole genome instead of its value
+        """
+        op = self.__class__._mutateFunc
+        if hasattr(op, "mutate_genome"):
+            op.mutate_genome(self)
+        else:
+            self.value = op(self.value)
         return self
 
     @genome_operator
@@ -88,11 +121,68 @@ class AbstractGenome():
         return self
 
     @genome_operator
-    def evaluate(self):
-        """Evaluate on the objective function"""
-        self.fitness = self.__class__._evaluateFunc(self.value)
+    def evaluate(self, fidelity: float = None):
+        """Evaluate on the objective function
+           Objectives returning a sequence produce a vector fitness (multi-objective)
+           If fidelity is given the objective is called as objective(value, fidelity=fidelity)
+           and the genome is tagged with it, None is full fidelity
+        """
+        func = self.__class__._evaluateFunc
+        result = func(self.value) if fidelity is None else func(self.value, fidelity=fidelity)
+        self.fitness, self.fidelity = as_fitness(result), fidelity
         return self.fitness
 
+    @classmethod
+    @genome_operator
+    def evaluate_batch(cls, population: List, fidelity: float = None):
+        """Evaluate a list of genomes
+           If a batched objective was set, it is called once with the population matrix
+           and must return one fitness per row
+        """
+        if not hasattr(cls, "_evaluate_batchFunc"):
+            for x in population: x.evaluate(fidelity)
+            return
+        func = cls._evaluate_batchFunc
+        M = cls.as_matrix(population)
+        fitnesses = func(M) if fidelity is None else func(M, fidelity=fidelity)
+        for x, f in zip(population, fitnesses):
+            x.fitness, x.fidelity = as_fitness(f), fidelity
+
+    @classmethod
+    def validate_batch(cls, population: List):
+        """Validate a list of genomes, validators with a truthy `batched` attribute
+           are called once with the population matrix
+        """
+        if not hasattr(cls, "_validateFunc"):
+            return
+        if not getattr(cls._validateFunc, "batched", False):
+            for x in population: x.validate()
+            return
+        for x, val in zip(population, cls.from_matrix(cls._validateFunc(cls.as_matrix(population)))):
+            x.value = val.value
+
+    @classmethod
+    def check_batch(cls, population: List):
+        """Fatal checks over a list of genomes, raises GenValidationError
+           Genome types with constraints on their values override it
+        """
+        pass
+
+    @classmethod
+    def random_batch(cls, n: int, *args, **kwargs):
+        """Returns n random genomes, genome types may draw them all in one call"""
+        return [cls.random(*args, **kwargs) for _ in range(n)]
+
+    @classmethod
+    def as_matrix(cls, population: List) -> np.ndarray:
+        """Stacks the values of the population in a matrix with one row per genome"""
+        return np.array([x.value for x in population])
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray) -> List:
+        """Inverse of as_matrix, returns one (not evaluated) genome per row"""
+        return [cls(row) for row in matrix]
+
     @classmethod
     def generator(cls, *args, **kwargs):
         """Creates a GenomeGenerator object
@@ -121,19 +211,41 @@ class BinaryGenome:
     def random(cls, size: int):
         return cls("".join(np.random.randint(2,size=(size,)).astype(str)))
 
+    @classmethod
+    def random_batch(cls, n: int, size: int):
+        return cls.from_matrix(random.randint(2, size=(n, size)))
+
+    @classmethod
+    def as_matrix(cls, population: List) -> np.ndarray:
+        """Matrix of 0/1 uint8, one row per genome"""
+        bits = np.frombuffer("".join(x.value for x in population).encode(), dtype=np.uint8)
+        return bits.reshape(len(population), -1) - ord("0")
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray) -> List:
+        chars = (np.asarray(matrix) + ord("0")).astype(np.uint8)
+        return [cls(row.tobytes().decode()) for row in chars]
+
 @GenomeType
 class FloatGenome:
-    """ Genome represented by a np array of float32 """
+    """ Genome represented by a np array of floats
+        The dtype (float64 by default) is chosen in the generator and kept by the operators
+    """
     value: np.ndarray
 
     def __post_init__(self):
-        self.value = self.value.astype(np.float_)
+        self.value = np.asarray(self.value)
+        if self.value.dtype.kind != 'f':
+            self.value = self.value.astype(np.float64)
+
+    @classmethod
+    def random(cls, size: int, bounds: Union[Size, Sizes, Bounds], dtype: np.dtype = np.float64):
+        return cls(random.uniform(*to_bounds(bounds), size=size).astype(dtype))
 
     @classmethod
-    def random(cls, size: int, bounds: Union[Size, Sizes]):
-        if isinstance(bounds[0], (int, float)):
-            return cls(random.uniform(*bounds, size=size))
-        return np.array([random.uniform(*b) for b in bounds])
+    def random_batch(cls, n: int, size: int, bounds: Union[Size, Sizes, Bounds],
+                     dtype: np.dtype = np.float64):
+        return cls.from_matrix(random.uniform(*to_bounds(bounds), size=(n, size)).astype(dtype))
 
 @GenomeType
 class PermutationGenome:
@@ -141,8 +253,28 @@ class PermutationGenome:
     value: Permutation
 
     def __post_init__(self):
-        self.value = is_permutation(self.value)
+        if check_on_build():
+            self.value = is_permutation(self.value)
+
+    @classmethod
+    def check_batch(cls, population: List):
+        if not population: return
+        # Values of different lengths do not stack in a matrix
+        if len({len(x.value) for x in population}) > 1:
+            for x in population: is_permutation(x.value)
+            return
+        valid = is_permutation_batch(cls.as_matrix(population))
+        if not valid.all():
+            raise GenValidationError(f" {population[int(np.argmin(valid))].value} Not a valid permutation")
 
     @classmethod
     def random(cls, size: int):
         return cls(list(random.permutation(size)))
+
+    @classmethod
+    def random_batch(cls, n: int, size: int):
+        return cls.from_matrix(np.argsort(random.random((n, size)), axis=1))
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray) -> List:
+        return [cls(row) for row in np.asarray(matrix).tolist()]
@@ -0,0 +1,148 @@
+"""
+Full population history stored in memory-mapped .npy files
+Rows of every generation are appended to the same files, offsets.npy
+holds where each generation starts so any of them can be read without loading the rest
+and runs.npy the generation each run starts at
+"""
+from .callbacks import BaseCallback
+from .core import *
+from .genome import AbstractGenome, fitness_array
+
+__all__ = ["HistoryRecorder", "History"]
+
+class GrowableMemmap:
+    """.npy file opened as a memmap that doubles its capacity (first axis) when full
+    @param append Keep the rows of an existing file and append after them, otherwise it is overwritten
+    """
+    def __init__(self, path: PathOrStr, row_shape: tuple, dtype: np.dtype, capacity: int, append: bool = False):
+        self.path = Path(path)
+        self.rowShape, self.dtype = tuple(row_shape), np.dtype(dtype)
+        self.size = 0
+        if append and self.path.exists():
+            self._data = np.lib.format.open_memmap(self.path, mode='r+')
+            assert self._data.shape[1:] == self.rowShape and self._data.dtype == self.dtype, \
+                f"{self.path} holds rows of another shape or type"
+            self.size = len(self._data)
+            self._resize(self.size + max(1, capacity))
+            return
+        self._data = np.lib.format.open_memmap(self.path, mode='w+', dtype=self.dtype,
+                                               shape=(max(1, capacity),) + self.rowShape)
+
+    def _resize(self, capacity: int):
+        old = self._data
+        old.flush()
+        tmp = self.path.with_suffix(".tmp.npy")
+        new = np.lib.format.open_memmap(tmp, mode='w+', dtype=self.dtype,
+                                        shape=(capacity,) + self.rowShape)
+        new[:self.size] = old[:self.size]
+        new.flush()
+        del old, self._data
+        os.replace(tmp, self.path)
+        self._data = np.lib.format.open_memmap(self.path, mode='r+')
+
+    def append(self, rows: np.ndarray):
+        if self.size + len(rows) > len(self._data):
+            self._resize(max(2*len(self._data), self.size + len(rows)))
+        self._data[self.size:self.size+len(rows)] = rows
+        self.size += len(rows)
+
+    def close(self):
+        """Flushes the file and trims it to the used rows"""
+        if self.size < len(self._data):
+            self._resize(self.size)
+        self._data.flush()
+
+class HistoryRecorder(BaseCallback):
+    """Records the population of every generation (the initial one is generation 0) in `path`:
+    values.npy, fitness.npy, parents.npy (indices in the previous generation, -1 padded),
+    is_child.npy (False for parents that survived, their index is parents[:, 0]), offsets.npy and runs.npy.
+    Files are preallocated for the whole run and grow if needed, read them back with History.
+    Every run (e.g. each one of simulate) overwrites the files unless `append` is True
+    @param append Append the generations of every run after the ones already recorded in `path`
+    """
+    order = 20
+    def __init__(self, algorithm, path: PathOrStr = "history", append: bool = False):
+        self.algorithm = algorithm
+        self.path = Path(path)
+        self.append = append
+        self._files = None
+
+    def _open(self, values: np.ndarray, fitness: np.ndarray, capacity: int):
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Only appended when every file of a previous history is there
+        append = self.append and all((self.path/f"{k}.npy").exists()
+                                     for k in ("values", "fitness", "parents", "is_child", "offsets", "runs"))
+        self._files = dict(
+            values=GrowableMemmap(self.path/"values.npy", values.shape[1:], values.dtype, capacity, append),
+            fitness=GrowableMemmap(self.path/"fitness.npy", fitness.shape[1:], fitness.dtype, capacity, append),
+            parents=GrowableMemmap(self.path/"parents.npy", (self.algorithm.numParents,), np.int32, capacity, append),
+            is_child=GrowableMemmap(self.path/"is_child.npy", (), bool, capacity, append),
+            offsets=GrowableMemmap(self.path/"offsets.npy", (), np.int64, 64, append),
+            runs=GrowableMemmap(self.path/"runs.npy", (), np.int64, 16, append))
+        offsets = self._files["offsets"]
+        if offsets.size == 0: offsets.append(np.zeros(1, dtype=np.int64))
+        self._files["runs"].append(np.array([offsets.size - 1]))
+
+    def _record(self, population: List[AbstractGenome], parents: np.ndarray, is_child: np.ndarray):
+        values = population[0].__class__.as_matrix(population)
+        fitness = fitness_array(population)
+        if self._files is None:
+            self._open(values, fitness, len(population)*(self.algorithm.maxGenerations+1))
+        for k, rows in (("values", values), ("fitness", fitness), ("parents", parents), ("is_child", is_child)):
+            self._files[k].append(rows)
+        self._files["offsets"].append(np.array([self._files["values"].size]))
+
+    def on_run_begin(self):
+        self._files = None
+        n = len(self.algorithm.population)
+        parents = np.full((n, self.algorithm.numParents), -1, dtype=np.int32)
+        self._record(self.algorithm.population, parents, np.zeros(n, dtype=bool))
+
+    def on_generation_end(self):
+        pidx, chidx = self.algorithm.survivors
+        children = self.algorithm.children
+        parents = np.full((len(pidx)+len(chidx), self.algorithm.numParents), -1, dtype=np.int32)
+        parents[:len(pidx), 0] = pidx
+        for row, i in enumerate(chidx, len(pidx)):
+            p = getattr(children[i], "_parents", [])
+            parents[row, :len(p)] = p
+        is_child = np.arange(len(parents)) >= len(pidx)
+        self._record(self.algorithm.population, parents, is_child)
+
+    def on_run_end(self):
+        for f in self._files.values(): f.close()
+
+class History:
+    """Read-only access to a recorded history, files are memory-mapped
+    history[g] returns (values, fitness, parents, is_child) of generation g,
+    runs holds the generation every recorded run starts at
+    """
+    def __init__(self, path: PathOrStr = "history"):
+        path = Path(path)
+        self.offsets = np.load(path/"offsets.npy")
+        self.values = np.load(path/"values.npy", mmap_mode='r')
+        self.fitness = np.load(path/"fitness.npy", mmap_mode='r')
+        self.parents = np.load(path/"parents.npy", mmap_mode='r')
+        self.isChild = np.load(path/"is_child.npy", mmap_mode='r')
+        self.runs = np.load(path/"runs.npy")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, g: int):
+        if g < 0: g += len(self)
+        s = slice(self.offsets[g], self.offsets[g+1])
+        return self.values[s], self.fitness[s], self.parents[s], self.isChild[s]
+
+    def lineage(self, g: int, i: int) -> List[int]:
+        """Indices of the first parent of individual i of generation g, going back to the first
+        generation of its run or to the first genome without parents
+        """
+        if g < 0: g += len(self)
+        first = self.runs[np.searchsorted(self.runs, g, side='right') - 1]
+        res = [i]
+        for gen in range(g, first, -1):
+            p = int(self.parents[self.offsets[gen] + res[-1], 0])
+            if p < 0: break
+            res.append(p)
+        return res[::-1]
@@ -0,0 +1,239 @@
+"""
+Local searches used to refine children (memetic algorithms)
+A LocalSearch is a callable that receives a value, its fitness, an evaluation function and a budget
+and returns the improved value, its fitness and the amount of objective evaluations it used.
+The evaluation function returns the (validated) value and its fitness.
+Searches whose fitness is estimated (e.g. from distance deltas) set `estimated`,
+MemeticSearch then scores the improved value again before keeping it.
+"""
+from .callbacks import BaseCallback
+from .core import *
+from .genome import *
+
+__all__ = ["LocalSearch", "TwoOptSearch", "OrOptSearch", "CoordinateSearch", "PatternSearch",
+           "MemeticSearch"]
+
+class LocalSearch:
+    """ Base class for all local searches"""
+    genome_type = None
+    estimated = False
+    def __call__(self, value, fitness: float, evaluate: Callable, budget: int):
+        return self.search(value, fitness, evaluate, budget)
+
+# Permutation searches, moves are scored with the distance matrix instead of the objective,
+# every scored move counts as one evaluation of the budget. The deltas assume a symmetric matrix
+class TwoOptSearch(LocalSearch):
+    """Best improvement 2-opt over a closed tour
+    @param data Symmetric distance matrix, the fitness must be `fitness_sign` times the tour length
+        (as in -traveling_salesman_objective)
+    @param max_passes Maximum amount of improving moves
+    """
+    genome_type = PermutationGenome
+    estimated = True
+    def __init__(self, data: Union[np.ndarray, List[List[float]]], fitness_sign: float = -1.0, max_passes: int = None):
+        self.data = np.asarray(data, dtype=float)
+        assert np.allclose(self.data, self.data.T), "The distance matrix must be symmetric"
+        self.fitnessSign = fitness_sign
+        self.maxPasses = max_passes
+
+    def search(self, value: Permutation, fitness: float, evaluate: Callable, budget: int):
+        D, tour = self.data, np.array(value)
+        n = len(tour)
+        passes, used = 0, 0
+        while (self.maxPasses is None or passes < self.maxPasses) and used < budget:
+            best_delta, best_move = -1e-9, None
+            for i in range(n-2):
+                if used >= budget: break
+                a, b = tour[i], tour[i+1]
+                j = np.arange(i+2, n if i > 0 else n-1)[:budget-used]
+                used += len(j)
+                c, d = tour[j], tour[(j+1) % n]
+                delta = D[a, c] + D[b, d] - D[a, b] - D[c, d]
+                k = np.argmin(delta)
+                if delta[k] < best_delta:
+                    best_delta, best_move = delta[k], (i, j[k])
+            if best_move is None:
+                break
+            i, j = best_move
+            tour[i+1:j+1] = tour[i+1:j+1][::-1]
+            fitness += self.fitnessSign*best_delta
+            passes += 1
+        return tour.tolist(), fitness, used
+
+class OrOptSearch(LocalSearch):
+    """Moves segments of 1 to 3 cities (possibly reversed) to their best position in the tour
+    @param data Symmetric distance matrix, the fitness must be `fitness_sign` times the tour length
+    @param max_passes Maximum amount of improving moves
+    """
+    genome_type = PermutationGenome
+    estimated = True
+    def __init__(self, data: Union[np.ndarray, List[List[float]]], fitness_sign: float = -1.0, segment_lengths: Collection[int] = (1, 2, 3),
+                 max_passes: int = None):
+        self.data = np.asarray(data, dtype=float)
+        assert np.allclose(self.data, self.data.T), "The distance matrix must be symmetric"
+        self.fitnessSign = fitness_sign
+        self.segmentLengths = segment_lengths
+        self.maxPasses = max_passes
+
+    def search(self, value: Permutation, fitness: float, evaluate: Callable, budget: int):
+        D, tour = self.data, np.array(value)
+        n = len(tour)
+        passes, used = 0, 0
+        while (self.maxPasses is None or passes < self.maxPasses) and used < budget:
+            best_delta, best_move = -1e-9, None
+            for L in self.segmentLengths:
+                if L > n - 3: continue
+                for i in range(n):
+                    if used >= budget: break
+                    # Rotate so the segment is at positions 1..L
+                    r = np.roll(tour, -(i-1))
+                    p, seg, nx = r[0], r[1:L+1], r[L+1]
+                    rest = np.concatenate(([p], r[L+1:]))
+                    removal = D[p, nx] - D[p, seg[0]] - D[seg[-1], nx]
+                    # Both orientations of an insertion point are scored
+                    m = -(-(budget - used)//2)
+                    c, d = rest[1:][:m], np.roll(rest, -1)[1:][:m]
+                    used += 2*len(c)
+                    forward = D[c, seg[0]] + D[seg[-1], d] - D[c, d]
+                    backward = D[c, seg[-1]] + D[seg[0], d] - D[c, d]
+                    for rev, insertion in ((False, forward), (True, backward)):
+                        k = np.argmin(insertion)
+                        if removal + insertion[k] < best_delta:
+                            best_delta = removal + insertion[k]
+                            best_move = (rest, seg[::-1] if rev else seg, k+1)
+            if best_move is None:
+                break
+            rest, seg, k = best_move
+            tour = np.concatenate((rest[:k+1], seg, rest[k+1:]))
+            fitness += self.fitnessSign*best_delta
+            passes += 1
+        return tour.tolist(), fitness, used
+
+# Float searches, every trial point costs one objective evaluation
+class CoordinateSearch(LocalSearch):
+    """Tries +-step on every coordinate, the step shrinks after a sweep without improvement
+    @param step Initial step, scalar or one per dimension
+    """
+    genome_type = FloatGenome
+    def __init__(self, step: float = 0.1, shrink: float = 0.5, min_step: float = 1e-6):
+        self.step = step
+        self.shrink = shrink
+        self.minStep = min_step
+
+    def _explore(self, x: np.ndarray, fitness: float, step: np.ndarray, evaluate: Callable, budget: int):
+        """One sweep of coordinate moves, returns the best point found"""
+        used = 0
+        for i in range(len(x)):
+            for sign in (1, -1):
+                if used >= budget:
+                    return x, fitness, used
+                y = x.copy()
+                y[i] += sign*step[i]
+                y, fy = evaluate(y)
+                used += 1
+                if fy > fitness:
+                    x, fitness = y, fy
+                    break
+        return x, fitness, used
+
+    def search(self, value: np.ndarray, fitness: float, evaluate: Callable, budget: int):
+        x, used = value.copy(), 0
+        step = np.broadcast_to(np.asarray(self.step, dtype=value.dtype), x.shape).copy()
+        while used < budget and np.max(step) > self.minStep:
+            x, new_fitness, n = self._explore(x, fitness, step, evaluate, budget - used)
+            used += n
+            if new_fitness <= fitness:
+                step *= self.shrink
+            fitness = new_fitness
+        return x, fitness, used
+
+class PatternSearch(CoordinateSearch):
+    """Hooke-Jeeves pattern search: coordinate exploration followed by
+    a move along the direction of the last improvement
+    """
+    def search(self, value: np.ndarray, fitness: float, evaluate: Callable, budget: int):
+        x, used = value.copy(), 0
+        step = np.broadcast_to(np.asarray(self.step, dtype=value.dtype), x.shape).copy()
+        while used < budget and np.max(step) > self.minStep:
+            y, fy, n = self._explore(x, fitness, step, evaluate, budget - used)
+            used += n
+            if fy <= fitness:
+                step *= self.shrink
+                continue
+            # Pattern moves while they keep improving
+            while used < budget:
+                z, fz = evaluate(y + (y - x))
+                used += 1
+                x, fitness = y, fy
+                if fz <= fy:
+                    break
+                y, fy = z, fz
+            x, fitness = y, fy
+        return x, fitness, used
+
+class MemeticSearch(BaseCallback):
+    """Refines evaluated children with a local search before survivor selection,
+    trial values are scored by the evaluator of the algorithm, so are the improvements of
+    searches with an estimated fitness before they are kept. Adds the local_search_evaluations and local_search_gain metrics
+    @param search LocalSearch applied to the children
+    @param top_k Refine the k best children
+    @param fraction Refine a random fraction of the children (used if top_k is None)
+    @param budget Evaluations (or scored moves) per generation, split evenly among the refined children
+    @param lamarckian If True the improved value is written back (Lamarckian),
+        otherwise only the fitness is (Baldwinian)
+    """
+    order = -10
+    def __init__(self, algorithm, search: LocalSearch, top_k: int = None, fraction: float = 0.1,
+                 budget: int = 100, lamarckian: bool = True):
+        self.algorithm = algorithm
+        self.search = search
+        self.topK = top_k
+        self.fraction = fraction
+        self.budget = budget
+        self.lamarckian = lamarckian
+        self.metrics = [self.local_search_evaluations, self.local_search_gain]
+        self._evaluations, self._gain = 0, 0.0
+
+    def _evaluation(self, child: AbstractGenome) -> Callable:
+        """Evaluation function of the search, values are validated and scored by the evaluator
+        of the algorithm at the fidelity of child
+        """
+        # Evaluators only have to accept the fidelity when one is used, like in Algorithm
+        fidelity = get_fidelity(child)
+        kwargs = dict() if fidelity is None else dict(fidelity=fidelity)
+        def evaluate(value):
+            x = child.copy()
+            x.value = value
+            self.algorithm.evaluator([x.validate()], **kwargs)
+            return x.value, x.fitness
+        return evaluate
+
+    def on_survivor_begin(self):
+        children = self.algorithm.children
+        self._evaluations, self._gain = 0, 0.0
+        if len(children) == 0:
+            return
+        if self.topK is not None:
+            selected = sorted(children, key=lambda x: x.fitness, reverse=True)[:self.topK]
+        else:
+            k = max(1, int(round(self.fraction*len(children))))
+            selected = [children[i] for i in random.choice(len(children), size=k, replace=False)]
+        budget = self.budget // len(selected)
+        for child in selected:
+            evaluate = self._evaluation(child)
+            value, fitness, used = self.search(child.value, child.fitness, evaluate, budget)
+            self._evaluations += used
+            if self.search.estimated and fitness > child.fitness:
+                value, fitness = evaluate(value)
+                self._evaluations += 1
+            if fitness > child.fitness:
+                self._gain += fitness - child.fitness
+                if self.lamarckian:
+                    child.value = value
+                child.fitness = fitness
+
+    def local_search_evaluations(self, population: List[AbstractGenome]) -> int:
+        return self._evaluations
+
+    def local_search_gain(self, population: List[AbstractGenome]) -> float:
+        return self._gain
@@ -1,20 +1,65 @@
 """Metrics are defined here
 A metric is a function that takes the population as an argument and returns a number
+(or an array of numbers per objective when the fitness is a vector)
 Metrics will be called and stored every generation
 """
 from .core import *
-from .genome import AbstractGenome
+from .genome import AbstractGenome, BinaryGenome, FloatGenome, PermutationGenome, fitness_array
 
-__all__ = ["max_fitness", "min_fitness", "mean_fitness", "std_fitness"]
+__all__ = ["max_fitness", "min_fitness", "mean_fitness", "std_fitness", "hamming_diversity",
+           "euclidean_diversity", "permutation_position_diversity", "permutation_edge_diversity"]
 
 def max_fitness(population: List[AbstractGenome]) -> float:
-    return max(x.fitness for x in population)
+    return np.max(fitness_array(population), axis=0)
 
 def min_fitness(population: List[AbstractGenome]) -> float:
-    return min(x.fitness for x in population)
+    return np.min(fitness_array(population), axis=0)
 
 def mean_fitness(population: List[AbstractGenome]) -> float:
-    return np.mean([x.fitness for x in population])
+    return np.mean(fitness_array(population), axis=0)
 
 def std_fitness(population: List[AbstractGenome]) -> float:
-    return np.std([x.fitness for x in population])
\ No newline at end of file
+    return np.std(fitness_array(population), axis=0)
+
+## Diversity metrics
+# Pairwise means are computed from per-column (or per-edge) counts,
+# which is exact and O(n) in the population size instead of O(n^2) over every pair
+
+def _equal_pairs(keys: np.ndarray) -> int:
+    """Amount of pairs of equal entries in keys"""
+    counts = np.unique(keys, return_counts=True)[1].astype(np.int64)
+    return int(np.sum(counts*(counts-1)//2))
+
+def hamming_diversity(population: List[BinaryGenome]) -> float:
+    """Mean pairwise Hamming distance divided by the genome length"""
+    n = len(population)
+    if n < 2: return 0.0
+    M = BinaryGenome.as_matrix(population)
+    ones = M.sum(axis=0, dtype=np.int64)
+    return float(np.sum(ones*(n-ones))) / (n*(n-1)/2 * M.shape[1])
+
+def euclidean_diversity(population: List[FloatGenome]) -> float:
+    """Mean Euclidean distance to the centroid of the population"""
+    M = FloatGenome.as_matrix(population)
+    return float(np.mean(np.linalg.norm(M - M.mean(axis=0), axis=1)))
+
+def permutation_position_diversity(population: List[PermutationGenome]) -> float:
+    """Mean pairwise fraction of positions holding different values"""
+    n = len(population)
+    if n < 2: return 0.0
+    M = PermutationGenome.as_matrix(population).astype(np.int64)
+    L = M.shape[1]
+    shared = _equal_pairs(np.arange(L)*L + M)
+    return 1.0 - shared / (n*(n-1)/2 * L)
+
+def permutation_edge_diversity(population: List[PermutationGenome]) -> float:
+    """Mean pairwise fraction of (undirected, closed tour) edges not shared,
+    tours of less than 3 values are all the same closed tour"""
+    n = len(population)
+    if n < 2: return 0.0
+    M = PermutationGenome.as_matrix(population).astype(np.int64)
+    L = M.shape[1]
+    if L < 3: return 0.0
+    A, B = M, np.roll(M, -1, axis=1)
+    shared = _equal_pairs(np.minimum(A, B)*L + np.maximum(A, B))
+    return 1.0 - shared / (n*(n-1)/2 * L)
\ No newline at end of file
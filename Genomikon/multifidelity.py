@@ -0,0 +1,58 @@
+"""
+Multi-fidelity screening
+Children are scored with a cheap, reduced fidelity version of the objective
+and only the most promising fraction of them is evaluated at full fidelity
+"""
+from .callbacks import BaseCallback
+from .core import *
+from .genome import AbstractGenome, fitness_array, fitness_key
+
+__all__ = ["MultiFidelityScreening"]
+
+def _ranks(x: np.ndarray) -> np.ndarray:
+    return np.argsort(np.argsort(x, kind="stable"), kind="stable").astype(float)
+
+class MultiFidelityScreening(BaseCallback):
+    """Evaluates every child with the evaluator of the algorithm at the given fidelity
+    (the objective is called as objective(value, fidelity=fidelity)) and keeps only the `fraction`
+    with the best low fidelity fitness, which the algorithm then evaluates at full fidelity.
+    The rest are discarded before evaluation (use it with a survivor selector that
+    tolerates fewer children, like MergeGenerationSelector)
+    Adds the fidelity_rank_correlation metric (Spearman correlation between the low and full
+    fidelity fitness of the promoted children, scalar fitness only)
+    @param fidelity Fidelity passed to the objective
+    @param fraction Fraction of children promoted to full fidelity
+    """
+    order = -5
+    def __init__(self, algorithm, fidelity: float = 0.1, fraction: float = 0.25):
+        self.algorithm = algorithm
+        self.fidelity = fidelity
+        self.fraction = fraction
+        self.metrics = [self.fidelity_rank_correlation]
+        # Low fidelity fitness of the promoted children by id, children may be evaluated at full
+        # fidelity in a later generation and in any order (see SteadyStateAlgorithm)
+        self._low, self._correlation = dict(), np.nan
+
+    def on_run_begin(self):
+        self._low = dict()
+
+    def on_evaluation_begin(self):
+        children = self.algorithm.children
+        if len(children) == 0: return
+        self.algorithm.evaluator(children, fidelity=self.fidelity)
+        k = max(1, int(np.ceil(self.fraction*len(children))))
+        best = sorted(sorted(range(len(children)), key=lambda i: fitness_key(children[i]), reverse=True)[:k])
+        self.algorithm.children = [children[i] for i in best]
+        self._low.update((id(x), x.fitness) for x in self.algorithm.children)
+
+    def on_survivor_begin(self):
+        self._correlation = np.nan
+        promoted = [x for x in self.algorithm.children if id(x) in self._low]
+        low = np.array([self._low.pop(id(x)) for x in promoted], dtype=float)
+        if len(promoted) < 2 or low.ndim > 1: return
+        full = fitness_array(promoted)
+        if np.ptp(low) > 0 and np.ptp(full) > 0:
+            self._correlation = float(np.corrcoef(_ranks(low), _ranks(full))[0, 1])
+
+    def fidelity_rank_correlation(self, population: List[AbstractGenome]) -> float:
+        return self._correlation
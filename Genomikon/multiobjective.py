@@ -0,0 +1,152 @@
+"""
+Multi-objective optimization (NSGA-II)
+A genome has a vector fitness when its objective function returns a sequence,
+every objective is maximized.
+Fronts are numbered from 0 (the Pareto front of the population).
+"""
+from .callbacks import BaseCallback
+from .core import *
+from .genome import AbstractGenome, fitness_array
+from .parent_selection import Selector
+from .survivor_selection import SurvivorSelector
+
+__all__ = ["non_dominated_sort", "crowding_distance", "NSGA2Selector", "NSGA2SurvivorSelector",
+           "ParetoArchive"]
+
+def _sort_two_objectives(F: np.ndarray) -> np.ndarray:
+    """Efficient non-dominated sort with binary search over the fronts, O(N log N).
+    Points are visited by decreasing first objective, so a front is only dominating a point
+    if its last inserted member (the one with the largest second objective) does.
+    """
+    order = np.lexsort((-F[:, 1], -F[:, 0]))
+    first, second = F[order, 0].tolist(), F[order, 1].tolist()
+    last_first, last_second = [], []
+    ranks = np.empty(len(F), dtype=np.int64)
+    for it, (a, b) in enumerate(zip(first, second)):
+        lo, hi = 0, len(last_second)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if last_second[mid] > b or (last_second[mid] == b and last_first[mid] > a):
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(last_second):
+            last_first.append(a)
+            last_second.append(b)
+        else:
+            last_first[lo], last_second[lo] = a, b
+        ranks[order[it]] = lo
+    return ranks
+
+def _domination_matrix(F: np.ndarray, block_size: int) -> np.ndarray:
+    """Boolean matrix D where D[i, j] is True if i dominates j, built by blocks of rows"""
+    n, m = F.shape
+    D = np.empty((n, n), dtype=bool)
+    for start in range(0, n, block_size):
+        block = F[start:start+block_size]
+        ge = np.ones((len(block), n), dtype=bool)
+        gt = np.zeros((len(block), n), dtype=bool)
+        for k in range(m):
+            ge &= block[:, k, None] >= F[None, :, k]
+            gt |= block[:, k, None] > F[None, :, k]
+        D[start:start+len(block)] = ge & gt
+    return D
+
+def non_dominated_sort(F: np.ndarray, block_size: int = 1024) -> np.ndarray:
+    """Returns the front of every row of the fitness matrix F (shape (n, objectives))
+    Two objectives use an O(N log N) sort, more objectives peel the fronts
+    from a domination matrix, with O(N^2) vectorized work and N^2 bytes of memory
+    """
+    F = np.asarray(F, dtype=float)
+    if F.ndim == 1:
+        F = F[:, None]
+    if F.shape[1] == 1:
+        return np.unique(-F[:, 0], return_inverse=True)[1].reshape(-1)
+    if F.shape[1] == 2:
+        return _sort_two_objectives(F)
+    D = _domination_matrix(F, block_size)
+    counts = D.sum(axis=0, dtype=np.int64)
+    ranks = np.empty(len(F), dtype=np.int64)
+    front, r = np.flatnonzero(counts == 0), 0
+    while front.size:
+        ranks[front] = r
+        counts -= D[front].sum(axis=0, dtype=np.int64)
+        counts[front] = -1
+        front, r = np.flatnonzero(counts == 0), r + 1
+    return ranks
+
+def crowding_distance(F: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+    """Returns the crowding distance of every row of F inside its own front
+    The extremes of each front get an infinite distance
+    """
+    F = np.asarray(F, dtype=float)
+    if F.ndim == 1:
+        F = F[:, None]
+    n = len(F)
+    distance = np.zeros(n)
+    for k in range(F.shape[1]):
+        order = np.lexsort((F[:, k], ranks))
+        f, r = F[order, k], ranks[order]
+        starts = np.flatnonzero(np.r_[True, r[1:] != r[:-1]])
+        ends = np.r_[starts[1:], n] - 1
+        scale = np.repeat(f[ends] - f[starts], ends - starts + 1)
+        d = np.zeros(n)
+        d[1:-1] = f[2:] - f[:-2]
+        d = np.divide(d, scale, out=np.zeros(n), where=scale > 0)
+        d[starts] = np.inf
+        d[ends] = np.inf
+        distance[order] += d
+    return distance
+
+def rank_and_crowding(population: List[AbstractGenome]):
+    F = fitness_array(population)
+    ranks = non_dominated_sort(F)
+    return ranks, crowding_distance(F, ranks)
+
+class NSGA2Selector(Selector):
+    """Binary tournament on (front, crowding distance)
+    Lower front wins, ties are broken by larger crowding distance
+    """
+    def select(self, population):
+        ranks, crowding = rank_and_crowding(population)
+        A, B = random.randint(0, len(population), size=(2, self._size))
+        a_wins = (ranks[A] < ranks[B]) | ((ranks[A] == ranks[B]) & (crowding[A] >= crowding[B]))
+        return list(np.where(a_wins, A, B))
+
+class NSGA2SurvivorSelector(SurvivorSelector):
+    """Merges parents and children and keeps the best fronts,
+    the last front that fits is truncated by crowding distance
+    """
+    def select(self, parents: List[AbstractGenome], children: List[AbstractGenome]):
+        ranks, crowding = rank_and_crowding(parents + children)
+        best = np.lexsort((-crowding, ranks))[:self._size]
+        pidx = [int(i) for i in best if i < len(parents)]
+        chidx = [int(i)-len(parents) for i in best if i >= len(parents)]
+        return pidx, chidx
+
+class ParetoArchive(BaseCallback):
+    """Keeps the non-dominated genomes found during the run in self.front
+    @param max_size If set, the archive is truncated by crowding distance
+    """
+    order = 5
+    def __init__(self, algorithm, max_size: int = None):
+        self.algorithm = algorithm
+        self.maxSize = max_size
+        self.front = []
+
+    def on_run_begin(self):
+        self.front = []
+
+    def on_generation_end(self):
+        candidates = self.front + [x.copy() for x in self.algorithm.population]
+        F = fitness_array(candidates)
+        if F.ndim == 1:
+            F = F[:, None]
+        ranks = non_dominated_sort(F)
+        keep = np.flatnonzero(ranks == 0)
+        # Drop duplicated fitness vectors, older entries are kept
+        keep = keep[np.unique(F[keep], axis=0, return_index=True)[1]]
+        if self.maxSize is not None and len(keep) > self.maxSize:
+            crowding = crowding_distance(F[keep], np.zeros(len(keep), dtype=np.int64))
+            keep = keep[np.argsort(-crowding, kind="stable")[:self.maxSize]]
+        self.front = [candidates[i] for i in sorted(keep)]
@@ -2,6 +2,7 @@
 Mutators are defined here.
 A Mutator is a callable that accepts a genotype
 and returns the same genotype with (probably) mutations
+Mutators may define mutate_batch, which mutates a (n, dim) matrix of values in a few array operations
 """
 from .core import *
 import Genomikon.core as core
@@ -23,6 +24,11 @@ class Mutator:
     def __call__(self, value):
         return self.mutate(value)
 
+    def _batch_genes(self, M: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows mutated with the mutation probability and the gene mutated in each of them"""
+        rows = np.flatnonzero(random.random(len(M)) <= self._prob)
+        return rows, random.randint(0, M.shape[1], size=len(rows))
+
 def flip_bit(c): return "0" if c == "1" else "1"
 
 # Binary mutations
@@ -93,13 +99,24 @@ class FloatNonUniformMutator(Mutator):
             return value
         k = random.randint(0,len(value))
         r = random.random()
-        ratio = float(core.CTX["GENERATION"]) / float(core.CTX["MAX_GENERATIONS"])
+        ctx = core.get_context()
+        ratio = float(ctx["GENERATION"]) / float(ctx["MAX_GENERATIONS"])
         if random.random() > 0.5:
             value[k] -= (value[k]-self._bounds[0])*(1-r**((1-ratio)*5))
         else:
             value[k] += (self._bounds[1]-value[k])*(1-r**((1-ratio)*5))
         return value
 
+    def mutate_batch(self, M: np.ndarray):
+        rows, k = self._batch_genes(M)
+        ctx = core.get_context()
+        ratio = float(ctx["GENERATION"]) / float(ctx["MAX_GENERATIONS"])
+        step = 1 - random.random(len(rows))**((1-ratio)*5)
+        v = M[rows, k]
+        M[rows, k] = np.where(random.random(len(rows)) > 0.5, v - (v-self._bounds[0])*step,
+                              v + (self._bounds[1]-v)*step)
+        return M
+
 class FloatBoundsMutator(Mutator):
     genomeType = FloatGenome
     def __init__(self, prob: float, low: float, high: float):
@@ -116,6 +133,11 @@ class FloatBoundsMutator(Mutator):
             value[k] = self._bounds[0]
         return value
 
+    def mutate_batch(self, M: np.ndarray):
+        rows, k = self._batch_genes(M)
+        M[rows, k] = np.where(random.random(len(rows)) > 0.5, self._bounds[1], self._bounds[0])
+        return M
+
 class FloatUniformMutator(Mutator):
     genomeType = FloatGenome
     def __init__(self, prob: float, low: float, high: float):
@@ -128,6 +150,11 @@ class FloatUniformMutator(Mutator):
         value[k] = self._bounds[0] + random.random()*(self._bounds[1]-self._bounds[0])
         return value
 
+    def mutate_batch(self, M: np.ndarray):
+        rows, k = self._batch_genes(M)
+        M[rows, k] = random.uniform(self._bounds[0], self._bounds[1], size=len(rows))
+        return M
+
 class ParameterBasedMutator(Mutator):
     genomeType = FloatGenome
     def __init__(self, prob: float, low: float, high: float):
@@ -139,11 +166,24 @@ class ParameterBasedMutator(Mutator):
             return value
         u = random.random()
         k = random.randint(0, len(value))
-        d = min(value[k]-self._bounds[0], self._bounds[1]-value[k]) / (self._bounds[1]-self._bounds[0])
-        eta = 100 + core.CTX["GENERATION"]
+        v = float(value[k])
+        d = min(v-self._bounds[0], self._bounds[1]-v) / (self._bounds[1]-self._bounds[0])
+        eta = 100 + core.get_context()["GENERATION"]
         if u > 0.5:
             dq = 1 - (2*(1-u)+2*(u-0.5)*(1-d)**(eta+1))**(1.0/(eta+1))
         else:
             dq = (2*u + (1-2*u)*(1-d)**(eta+1))**(1.0/(eta+1)) - 1
         value[k] += dq*(self._bounds[1]-self._bounds[0])
-        return value
\ No newline at end of file
+        return value
+
+    def mutate_batch(self, M: np.ndarray):
+        rows, k = self._batch_genes(M)
+        u = random.random(len(rows))
+        span = self._bounds[1]-self._bounds[0]
+        v = M[rows, k].astype(np.float64)
+        d = np.clip(np.minimum(v-self._bounds[0], self._bounds[1]-v) / span, 0, 1)
+        eta = 100 + core.get_context()["GENERATION"]
+        up = 1 - (2*(1-u)+2*(u-0.5)*(1-d)**(eta+1))**(1.0/(eta+1))
+        down = (2*u + (1-2*u)*(1-d)**(eta+1))**(1.0/(eta+1)) - 1
+        M[rows, k] = v + np.where(u > 0.5, up, down)*span
+        return M
\ No newline at end of file
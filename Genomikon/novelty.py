@@ -0,0 +1,95 @@
+"""
+Novelty search
+The fitness of a genome is the mean distance of its behaviour descriptor to its k nearest neighbours
+among an archive of past behaviours and the current generation, optionally mixed with the objective
+"""
+from .callbacks import BaseCallback
+from .core import *
+from .genome import AbstractGenome
+from .utils import PointArchive
+
+__all__ = ["NoveltyArchive", "NoveltySearch"]
+
+class NoveltyArchive(PointArchive):
+    """Growable archive of behaviour descriptors with blocked k nearest neighbour distances
+    @param k Amount of neighbours
+    @param max_size If set, the oldest descriptors are dropped once the archive is full
+    @param block_size Archive rows compared per block
+    """
+    def __init__(self, k: int = 15, max_size: int = None, block_size: int = 4096):
+        super().__init__(max_size, block_size)
+        self.k = k
+
+    @property
+    def descriptors(self) -> np.ndarray:
+        return self.points
+
+    def novelty(self, B: np.ndarray) -> np.ndarray:
+        """Mean distance of every descriptor of B to its k nearest neighbours
+        among the archive and the other rows of B
+        """
+        B = np.asarray(B, dtype=float)
+        archived, _ = self.kneighbors(B, self.k)
+        own, _ = PointArchive(block_size=self.blockSize).add(B).kneighbors(B, self.k, exclude_self=True)
+        best = np.partition(np.concatenate((archived, own), axis=1), self.k-1, axis=1)[:, :self.k]
+        finite = np.isfinite(best)
+        dist = np.sqrt(np.where(finite, best, 0))
+        return np.sum(dist, axis=1) / np.maximum(finite.sum(axis=1), 1)
+
+class NoveltySearch(BaseCallback):
+    """Replaces the fitness of the population and the children with
+    (1-weight)*objective + weight*novelty just before survivor selection.
+    The objective value is kept in genome.objective, and the archive grows with the
+    `archive_rate` most novel children of every generation.
+    Adds the max_objective and archive_size metrics, the best genome by objective is in .best
+    @param behavior Function value -> behaviour descriptor (1d array)
+    @param archive NoveltyArchive, defaults to NoveltyArchive()
+    @param weight Weight of the novelty, 1 is pure novelty search
+    """
+    order = 5
+    def __init__(self, algorithm, behavior: Callable, archive: NoveltyArchive = None,
+                 weight: float = 1.0, archive_rate: int = 5):
+        self.algorithm = algorithm
+        self.behavior = behavior
+        self.archive = ifnone(archive, NoveltyArchive())
+        self.weight = weight
+        self.archiveRate = archive_rate
+        self.metrics = [self.max_objective, self.archive_size]
+        self.best = None
+
+    def _descriptors(self, genomes: List[AbstractGenome]) -> np.ndarray:
+        for x in genomes:
+            if not hasattr(x, "_behavior"): x._behavior = np.asarray(self.behavior(x.value), dtype=float).ravel()
+        return np.stack([x._behavior for x in genomes])
+
+    def _keep_objective(self, genomes: List[AbstractGenome]):
+        for x in genomes:
+            if not hasattr(x, "objective"): x.objective = x.fitness
+            if self.best is None or x.objective > self.best.objective:
+                self.best = x.copy()
+
+    def on_run_begin(self):
+        self._keep_objective(self.algorithm.population)
+
+    def on_objective_change(self):
+        self.best = None
+        for x in self.algorithm.population:
+            if hasattr(x, "objective"): del x.objective
+        self._keep_objective(self.algorithm.population)
+
+    def on_survivor_begin(self):
+        population, children = self.algorithm.population, self.algorithm.children
+        self._keep_objective(children)
+        genomes = population + children
+        novelty = self.archive.novelty(self._descriptors(genomes))
+        for x, nov in zip(genomes, novelty):
+            x.fitness = (1 - self.weight)*x.objective + self.weight*nov
+        if children and self.archiveRate > 0:
+            chosen = np.argsort(-novelty[len(population):], kind="stable")[:self.archiveRate]
+            self.archive.add(np.stack([children[i]._behavior for i in chosen]))
+
+    def max_objective(self, population: List[AbstractGenome]) -> float:
+        return max(getattr(x, "objective", x.fitness) for x in population)
+
+    def archive_size(self, population: List[AbstractGenome]) -> int:
+        return len(self.archive)
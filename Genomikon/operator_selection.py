@@ -0,0 +1,213 @@
+"""
+Adaptive operator selection
+A portfolio holds several crossovers (or mutators) and a policy that picks one for every use.
+Children remember which operators produced them and the fitness of their parents,
+the OperatorCredit callback rewards the operators with the improvement of the children
+after they are evaluated.
+"""
+from .callbacks import BaseCallback
+from .core import *
+from .crossover import Cross
+from .genome import *
+from .mutation import Mutator
+
+__all__ = ["AdaptivePursuit", "UCB1", "Portfolio", "CrossPortfolio", "MutatorPortfolio",
+           "OneFifthGaussianMutator", "OperatorCredit"]
+
+## Policies
+class AdaptivePursuit:
+    """Adaptive pursuit: the probability of the operator with the best estimated
+    quality is pushed towards p_max, the rest towards p_min
+    """
+    def __init__(self, p_min: float = 0.05, alpha: float = 0.8, beta: float = 0.8):
+        self.pMin = p_min
+        self.alpha = alpha
+        self.beta = beta
+
+    def reset(self, n: int):
+        self.quality = np.ones(n)/n
+        self.probabilities = np.ones(n)/n
+
+    def choose(self) -> int:
+        return random.choice(len(self.probabilities), p=self.probabilities)
+
+    def update(self, rewards: np.ndarray, used: np.ndarray):
+        self.quality[used] += self.alpha*(rewards[used] - self.quality[used])
+        p_max = 1 - (len(self.quality)-1)*self.pMin
+        target = np.full(len(self.quality), self.pMin)
+        target[np.argmax(self.quality)] = p_max
+        self.probabilities += self.beta*(target - self.probabilities)
+        self.probabilities /= self.probabilities.sum()
+
+class UCB1:
+    """Upper confidence bound multi-armed bandit"""
+    def __init__(self, c: float = 0.5):
+        self.c = c
+
+    def reset(self, n: int):
+        self.quality = np.zeros(n)
+        self.pulls = np.zeros(n)
+        self._updates = np.zeros(n)
+
+    def choose(self) -> int:
+        if np.any(self.pulls == 0):
+            k = int(np.argmin(self.pulls))
+        else:
+            k = int(np.argmax(self.quality + self.c*np.sqrt(2*np.log(self.pulls.sum())/self.pulls)))
+        self.pulls[k] += 1
+        return k
+
+    def update(self, rewards: np.ndarray, used: np.ndarray):
+        # Running mean of the rewards
+        self._updates[used] += 1
+        self.quality[used] += (rewards[used] - self.quality[used])/self._updates[used]
+
+## Portfolios
+def tag_credit(genome: AbstractGenome, owner: Union[Cross, Mutator], idx: int, parent_fitness: float):
+    """Records that operator idx of owner produced genome"""
+    if not hasattr(genome, "_credit"):
+        genome._credit = []
+        genome._parentFitness = parent_fitness
+    genome._credit.append((owner, idx))
+
+class Portfolio:
+    """ Base class for operators that receive credit
+    record() is called once per produced child and update() once per generation
+    """
+    def _init_portfolio(self, ops: List, policy: Union[AdaptivePursuit, UCB1]):
+        self.ops = list(ops)
+        self.policy = ifnone(policy, AdaptivePursuit())
+        self.policy.reset(len(self.ops))
+        self._improvements = [[] for _ in self.ops]
+        self.usage = np.zeros(len(self.ops))
+        self.reward = np.zeros(len(self.ops))
+
+    def record(self, idx: int, improvement: float):
+        self._improvements[idx].append(improvement)
+
+    def update(self):
+        counts = np.array([len(x) for x in self._improvements], dtype=float)
+        means = np.array([np.mean(np.maximum(x, 0)) if x else 0 for x in self._improvements])
+        self.usage = counts/max(counts.sum(), 1)
+        # Normalized improvement, the best operator of the generation gets 1
+        self.reward = means/means.max() if means.max() > 0 else means
+        self.policy.update(self.reward, counts > 0)
+        self._improvements = [[] for _ in self.ops]
+
+    def operator_metrics(self, prefix: str) -> List[Callable]:
+        metrics = []
+        for it, op in enumerate(self.ops):
+            for attr in ("usage", "reward"):
+                def _metric(population, it=it, attr=attr): return getattr(self, attr)[it]
+                _metric.__name__ = f"{prefix}_{it}_{op.__class__.__name__}_{attr}"
+                metrics.append(_metric)
+        return metrics
+
+class CrossPortfolio(Portfolio, Cross):
+    """Uses one of several crossovers (with their own probabilities) chosen by the policy
+    @param crosses Crossovers with the same number of parents
+    @param policy AdaptivePursuit (default) or UCB1
+    """
+    def __init__(self, crosses: List[Cross], policy: Union[AdaptivePursuit, UCB1] = None):
+        assert len(set(x.num_parents for x in crosses)) == 1
+        self._init_portfolio(crosses, policy)
+        self.genome_type = crosses[0].genome_type
+        self.num_parents = crosses[0].num_parents
+        self.num_children = max(x.num_children for x in crosses)
+
+    def __call__(self, *args) -> List[AbstractGenome]:
+        idx = self.policy.choose()
+        children = self.ops[idx](*args)
+        parent_fitness = max(x.fitness for x in args)
+        for x in children: tag_credit(x, self, idx, parent_fitness)
+        return children
+
+class MutatorPortfolio(Portfolio, Mutator):
+    """Uses one of several mutators chosen by the policy
+    @param mutators Mutators of the same genome type
+    @param policy AdaptivePursuit (default) or UCB1
+    """
+    def __init__(self, mutators: List[Mutator], policy: Union[AdaptivePursuit, UCB1] = None):
+        self._init_portfolio(mutators, policy)
+        self.genomeType = mutators[0].genomeType
+
+    def mutate(self, value):
+        return self.ops[self.policy.choose()](value)
+
+    def mutate_genome(self, genome: AbstractGenome):
+        idx = self.policy.choose()
+        op = self.ops[idx]
+        parent_fitness = getattr(genome, "_parentFitness", getattr(genome, "fitness", None))
+        if hasattr(op, "mutate_genome"):
+            op.mutate_genome(genome)
+        else:
+            genome.value = op(genome.value)
+        if parent_fitness is not None:
+            tag_credit(genome, self, idx, parent_fitness)
+
+class OneFifthGaussianMutator(Mutator):
+    """Adds N(0, sigma) noise to every gene, sigma follows the 1/5th success rule:
+    it grows when more than a fifth of the mutated children improve on their parents
+    and shrinks otherwise (needs the OperatorCredit callback)
+    """
+    genomeType = FloatGenome
+    def __init__(self, prob: float, sigma: float = 0.1, factor: float = 0.817):
+        self._prob = prob
+        self.sigma = sigma
+        self.factor = factor
+        self._successes, self._trials = 0, 0
+
+    def mutate(self, value: np.ndarray):
+        if random.random() > self._prob:
+            return value
+        return value + (self.sigma*random.standard_normal(len(value))).astype(value.dtype)
+
+    def mutate_genome(self, genome: AbstractGenome):
+        parent_fitness = getattr(genome, "_parentFitness", getattr(genome, "fitness", None))
+        new = self.mutate(genome.value)
+        if new is not genome.value and parent_fitness is not None:
+            tag_credit(genome, self, 0, parent_fitness)
+        genome.value = new
+
+    def record(self, idx: int, improvement: float):
+        self._successes += improvement > 0
+        self._trials += 1
+
+    def update(self):
+        if self._trials > 0:
+            rate = self._successes/self._trials
+            if rate > 0.2: self.sigma /= self.factor
+            elif rate < 0.2: self.sigma *= self.factor
+        self._successes, self._trials = 0, 0
+
+    def operator_metrics(self, prefix: str) -> List[Callable]:
+        def _metric(population): return self.sigma
+        _metric.__name__ = f"{prefix}_sigma"
+        return [_metric]
+
+class OperatorCredit(BaseCallback):
+    """Rewards the operators that produced each child with its improvement over its parents
+    and updates their policies once per generation.
+    Adds usage and reward metrics of the portfolios used as cross and mutate operators
+    """
+    order = -20
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.metrics = []
+        cls = algorithm.__genome_type__
+        for prefix, name in (("cross", "_crossFunc"), ("mutate", "_mutateFunc")):
+            op = getattr(cls, name, None)
+            if hasattr(op, "operator_metrics"):
+                self.metrics += op.operator_metrics(prefix)
+
+    def on_survivor_begin(self):
+        owners = set()
+        for child in self.algorithm.children:
+            if not hasattr(child, "_credit"):
+                continue
+            improvement = child.fitness - child._parentFitness
+            for owner, idx in child._credit:
+                owner.record(idx, improvement)
+                owners.add(owner)
+            del child._credit, child._parentFitness
+        for owner in owners: owner.update()
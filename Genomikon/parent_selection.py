@@ -69,8 +69,9 @@ class DeterministicSamplingSelector(Selector):
         for it, p in enumerate(expected):
             for _ in range(int(p)):
                 idxs.append(it)
-        expected = sorted([p - int(p) for p in expected], reverse=True)
-        idxs += expected[:self._size - len(idxs)]
+        # The rest are the genomes with the largest fractional parts
+        order = sorted(range(len(expected)), key=lambda i: expected[i] - int(expected[i]), reverse=True)
+        idxs += order[:self._size - len(idxs)]
         return idxs
 
 ## Tournament
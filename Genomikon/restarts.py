@@ -0,0 +1,80 @@
+"""
+Restart strategies are defined here
+A restart strategy is a callable that receives the algorithm and the restart number (starting at 1)
+and returns the (evaluated) population the next run of Algorithm.simulate starts from.
+Strategies changing the algorithm may undo it in end(algorithm), called once simulate finishes
+"""
+from .core import *
+from .genome import AbstractGenome, fitness_key
+
+__all__ = ["RestartStrategy", "HallOfFameRestart", "IPOPRestart", "FileRestart", "hall_of_fame"]
+
+def hall_of_fame(algorithm, k: int) -> List[AbstractGenome]:
+    """The k best distinct genomes among the bests of every generation of previous runs"""
+    distinct = {id(x): x for x in algorithm.bests}.values()
+    return [x.copy() for x in sorted(distinct, key=fitness_key, reverse=True)[:k]]
+
+class RestartStrategy:
+    """ Base class for all restart strategies"""
+    def __call__(self, algorithm, iteration: int) -> List[AbstractGenome]:
+        return self.restart(algorithm, iteration)
+
+    def end(self, algorithm):
+        """Called when simulate finishes"""
+        pass
+
+    def random_population(self, algorithm, n: int) -> List[AbstractGenome]:
+        """n new random (evaluated) genomes, drawn with the arguments of the generator"""
+        return algorithm.random_genomes(n)
+
+class HallOfFameRestart(RestartStrategy):
+    """Seeds the next run with the best genomes found so far, the rest is fresh random genomes
+    @param elite Amount of hall of fame genomes kept
+    """
+    def __init__(self, elite: int):
+        self.elite = elite
+
+    def restart(self, algorithm, iteration: int):
+        elite = hall_of_fame(algorithm, min(self.elite, algorithm.n))
+        return elite + self.random_population(algorithm, algorithm.n - len(elite))
+
+class IPOPRestart(RestartStrategy):
+    """Increasing population restarts: the population (and the sizes of the selectors)
+    grows by `factor` on every restart, the sizes of the selectors are restored when simulate finishes
+    @param elite Amount of hall of fame genomes kept
+    """
+    def __init__(self, factor: float = 2.0, elite: int = 0):
+        self.factor = factor
+        self.elite = elite
+        self._base = None
+
+    def restart(self, algorithm, iteration: int):
+        if self._base is None:
+            self._base = (algorithm.n, getattr(algorithm.parentSelector, "_size", None),
+                          getattr(algorithm.survivorSelector, "_size", None))
+        n, parents, survivors = self._base
+        scale = self.factor**iteration
+        if parents is not None: algorithm.parentSelector._size = int(round(parents*scale))
+        if survivors is not None: algorithm.survivorSelector._size = int(round(survivors*scale))
+        size = int(round(n*scale))
+        elite = hall_of_fame(algorithm, min(self.elite, size))
+        return elite + self.random_population(algorithm, size - len(elite))
+
+    def end(self, algorithm):
+        if self._base is None: return
+        _, parents, survivors = self._base
+        if parents is not None: algorithm.parentSelector._size = parents
+        if survivors is not None: algorithm.survivorSelector._size = survivors
+        self._base = None
+
+class FileRestart(RestartStrategy):
+    """Seeds the next run with a population saved with Algorithm.save_population,
+    completed with fresh random genomes up to the population size
+    """
+    def __init__(self, file_name: PathOrStr, reevaluate: bool = True):
+        self.file_name = file_name
+        self.reevaluate = reevaluate
+
+    def restart(self, algorithm, iteration: int):
+        seeded = algorithm.load_population(self.file_name, self.reevaluate)[:algorithm.n]
+        return seeded + self.random_population(algorithm, algorithm.n - len(seeded))
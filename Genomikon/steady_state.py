@@ -0,0 +1,174 @@
+""" Steady-state algorithm which breeds and evaluates children asynchronously"""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+import threading
+from .algorithm import Algorithm, GenerationRecord
+from .callbacks import BaseCallback
+from .core import *
+from .genome import AbstractGenome, fitness_key, get_fidelity
+from .parent_selection import Selector
+from .survivor_selection import SurvivorSelector
+from .validators import ValidationPolicy, get_validation
+
+# Workaround
+import Genomikon.core as core
+
+__all__ = ['SteadyStateAlgorithm']
+
+class _SerializedEvaluator:
+    """Calls an evaluator that is not reentrant one call at a time"""
+    reentrant = True
+    def __init__(self, evaluator: Callable):
+        self.evaluator = evaluator
+        self.metrics = getattr(evaluator, "metrics", [])
+        self._lock = threading.Lock()
+
+    def __call__(self, population: List[AbstractGenome], **kwargs):
+        with self._lock:
+            return self.evaluator(population, **kwargs)
+
+class SteadyStateAlgorithm(Algorithm):
+    """Asynchronous steady-state version of Algorithm.
+    The run is split in windows of `report_every` children. At the start of a window one batch of
+    parents is selected and the children are bred, mutated and validated, then they join a queue.
+    Every time an evaluation completes the next child of the queue is submitted, so workers never
+    wait for each other. A window closes as soon as its last child is submitted and an evaluation
+    completed after that, the evaluations still running carry over to the next window.
+    Use a report_every larger than workers, otherwise windows close with few evaluations.
+    Every hook of the callbacks fires once per window like in a generation of Algorithm:
+    on_evaluation_begin sees the bred children (and may screen them), on_survivor_begin
+    sees the children whose evaluation completed during the window, in completion order.
+    By default each child replaces the worst genome when it is not worse than it,
+    a survivor selector may be given instead but it must keep the population size.
+    Evaluations run in threads, one child per call of the evaluator. Evaluators reusing state
+    between calls (SharedMemoryEvaluator, TimeoutEvaluator, BrokerEvaluator) are called one
+    at a time, so only the default evaluator and evaluators with a truthy `reentrant`
+    attribute evaluate several children at once
+    @param parent_selector Selector, the window's children are bred cycling through its selection
+    @param survivor_selector Size preserving SurvivorSelector, None replaces the worst genome
+    @param executor Thread based executor running the evaluations, defaults to a ThreadPoolExecutor.
+        Process pools are rejected, genome types can not be pickled
+    @param workers Amount of evaluations kept in flight, defaults to the number of cpus
+    @param report_every Children bred per window, defaults to the population size
+    """
+    def __init__(self, population: List[AbstractGenome], parent_selector: Selector,
+                survivor_selector: SurvivorSelector=None, metrics:Collection[Callable]=[],
+                callbacks:Collection[BaseCallback]=[], executor: Executor=None,
+                workers: int=None, report_every: int=None, evaluator: Callable=None,
+                validation: ValidationPolicy=None):
+        if isinstance(executor, ProcessPoolExecutor):
+            raise ValueError("SteadyStateAlgorithm needs a thread based executor, genome types can not be pickled")
+        super().__init__(population, parent_selector, survivor_selector, metrics, callbacks,
+                         evaluator=evaluator, validation=validation)
+        self.executor = executor
+        self.workers = ifnone(workers, num_cpus())
+        self.reportEvery = ifnone(report_every, self.n)
+
+    def _breed(self, parents_idxs: List[int], size: int) -> List[AbstractGenome]:
+        """Crosses the parents of the window, cycling through them until there are size children"""
+        need = -(-size // self.numChildren) * self.numParents
+        children = self._cross([parents_idxs[i % len(parents_idxs)] for i in range(need)])[:size]
+        # Children may be evaluated in a later window, their parents are found again by identity
+        for x in children: x._parentGenomes = [self.population[i] for i in x._parents]
+        return children
+
+    def _select_survivors(self) -> Tuple[List[int], List[int]]:
+        if self.survivorSelector is not None:
+            pidx, chidx = self.survivorSelector(self.population, self.children)
+            assert len(pidx) + len(chidx) == len(self.population), "The survivor selector must keep the population size"
+            return pidx, chidx
+        # Each child replaces the worst genome when it is not worse than it
+        n, genomes = len(self.population), self.population + self.children
+        slots = list(range(n))
+        for j in range(n, len(genomes)):
+            worst = min(range(n), key=lambda s: fitness_key(genomes[slots[s]]))
+            if fitness_key(genomes[j]) >= fitness_key(genomes[slots[worst]]): slots[worst] = j
+        return [i for i in slots if i < n], [i - n for i in slots if i >= n]
+
+    def _set_parents(self):
+        """Indexes of the parents of the children in the current population, -1 if they are gone"""
+        index = {id(x): i for i, x in enumerate(self.population)}
+        for x in self.children:
+            x._parents = [index.get(id(g), -1) for g in getattr(x, "_parentGenomes", [])]
+            # Dropped so genomes do not keep their whole ancestry alive
+            if hasattr(x, "_parentGenomes"): del x._parentGenomes
+
+    def iterate(self, max_evaluations: int) -> Iterator[GenerationRecord]:
+        """Runs until `max_evaluations` children have been bred and evaluated
+        (fewer evaluations if callbacks screen children), yields a GenerationRecord per window.
+        Like Algorithm.iterate, callers that stop early should close the generator
+        """
+        self.population = [x.copy() for x in self.initialPopulation]
+        self.metrics_record = []
+        # Callbacks may call the evaluator too, so it is wrapped instead of the calls of the workers
+        if self.evaluator != self.__genome_type__.evaluate_batch and not getattr(self.evaluator, "reentrant", False):
+            self.evaluator = _SerializedEvaluator(self.evaluator)
+        executor = ifnone(self.executor, ThreadPoolExecutor(self.workers))
+        queue, pending = [], dict()
+        bred = 0
+        max_windows = -(-max_evaluations // self.reportEvery)
+        self.maxGenerations = max_windows
+        # Callbacks
+        for C in self.callbacks: C.on_run_begin()
+        try:
+            for gen in range(max_windows):
+                with core.set_context(MAX_GENERATIONS=max_windows, GENERATION=gen,
+                                      VALIDATION=ifnone(self.validation, get_validation())):
+                    gen_timer = time.perf_counter()
+                    # Callbacks
+                    for C in self.callbacks: C.on_generation_begin()
+
+                    ## Select one batch of parents for the window
+                    # Callbacks
+                    for C in self.callbacks: C.on_selection_begin()
+                    parents_idxs = self._select_parents()
+
+                    ## Breed the children of the window
+                    # Callbacks
+                    for C in self.callbacks: C.on_crossover_begin()
+                    size = min(self.reportEvery, max_evaluations - bred)
+                    self.children = self._breed(parents_idxs, size)
+                    bred += size
+
+                    ## Mutate and validate children
+                    # Callbacks
+                    for C in self.callbacks: C.on_mutation_begin()
+                    self._mutate(self.children)
+                    self.__genome_type__.validate_batch(self.children)
+                    self._check(self.children)
+
+                    ## Evaluate, a child is submitted every time a worker frees up
+                    # Callbacks
+                    for C in self.callbacks: C.on_evaluation_begin()
+                    queue += self.children
+                    # The window closes once its queue is empty, only the last one waits for every evaluation
+                    final, arrived = gen == max_windows - 1, []
+                    while queue or (pending and (final or not arrived)):
+                        while queue and len(pending) < self.workers:
+                            child = queue.pop(0)
+                            pending[executor.submit(self.evaluator, [child])] = child
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                            arrived.append(pending.pop(future))
+                    self.children = arrived
+
+                    ## Select survivors
+                    # Callbacks
+                    for C in self.callbacks: C.on_survivor_begin()
+                    if len({get_fidelity(x) for x in self.population + self.children}) > 1:
+                        raise ValueError("Survivor selection over fitnesses computed at different fidelities")
+                    self._set_parents()
+                    pidx, chidx = self._select_survivors()
+                    self.survivors = (pidx, chidx)
+                    self.population = [self.population[i] for i in pidx] + [self.children[i] for i in chidx]
+
+                    self._record(gen_timer)
+
+                    # Callbacks
+                    for C in self.callbacks: C.on_generation_end()
+                yield GenerationRecord(gen, self.bests[-1], self.bests[-1].fitness, self.metrics_record[-1])
+        finally:
+            for future in pending: future.cancel()
+            if self.executor is None: executor.shutdown()
+            # Callbacks
+            for C in self.callbacks: C.on_run_end()
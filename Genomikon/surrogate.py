@@ -0,0 +1,94 @@
+"""
+Surrogate assisted pre-screening
+A cheap model is fitted on every evaluated genome and predicts the fitness of the children,
+only the most promising fraction of them is evaluated on the objective function
+"""
+from .callbacks import BaseCallback
+from .core import *
+from .genome import AbstractGenome, fitness_array
+from .utils import PointArchive
+
+__all__ = ["KNNSurrogate", "SurrogateScreening"]
+
+class KNNSurrogate(PointArchive):
+    """Inverse distance weighted k nearest neighbours regressor (NumPy only)
+    Fitting is incremental, samples are appended to a growable archive
+    @param k Amount of neighbours
+    @param max_size If set, the oldest samples are dropped once the archive is full
+    @param block_size Archive rows compared per block
+    """
+    def __init__(self, k: int = 5, max_size: int = None, block_size: int = 256):
+        super().__init__(max_size, block_size)
+        self.k = k
+
+    def partial_fit(self, X: np.ndarray, y: np.ndarray):
+        """Adds the samples X (n, features) with targets y (n,) to the archive"""
+        return self.add(X, np.asarray(y, dtype=float))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        D, nn = self.kneighbors(X, self.k)
+        found = nn >= 0
+        w = np.where(found, 1.0/(np.sqrt(D) + 1e-12), 0)
+        return np.sum(w*np.where(found, self.targets[nn], 0), axis=1)/np.sum(w, axis=1)
+
+class SurrogateScreening(BaseCallback):
+    """Evaluates only the `fraction` of children with the best predicted fitness,
+    the rest are discarded before evaluation (use it with a survivor selector that
+    tolerates fewer children, like MergeGenerationSelector)
+    Adds the surrogate_hit_rate (promoted children that survived)
+    and surrogate_error (mean absolute prediction error) metrics
+    @param model Regressor with partial_fit, predict and len (and optionally reset), defaults to KNNSurrogate()
+    @param fraction Fraction of children to evaluate
+    @param min_samples Every child is evaluated until the model has this many samples
+    """
+    order = -5
+    def __init__(self, algorithm, model: KNNSurrogate = None, fraction: float = 0.5, min_samples: int = None):
+        self.algorithm = algorithm
+        self.model = ifnone(model, KNNSurrogate())
+        self.fraction = fraction
+        self.minSamples = ifnone(min_samples, algorithm.n)
+        self.metrics = [self.surrogate_hit_rate, self.surrogate_error]
+        # Predictions of the promoted children by id, children may be evaluated in a later
+        # generation and in any order (see SteadyStateAlgorithm)
+        self._predicted, self._promoted, self._error = dict(), set(), np.nan
+
+    def _features(self, genomes: List[AbstractGenome]) -> np.ndarray:
+        return genomes[0].__class__.as_matrix(genomes).astype(float)
+
+    def on_run_begin(self):
+        self._predicted = dict()
+        if len(self.model) == 0:
+            population = self.algorithm.population
+            self.model.partial_fit(self._features(population), fitness_array(population))
+
+    def on_objective_change(self):
+        # Samples scored with the previous objective are useless
+        if hasattr(self.model, "reset"): self.model.reset()
+        self.on_run_begin()
+
+    def on_evaluation_begin(self):
+        children = self.algorithm.children
+        if len(children) == 0 or len(self.model) < self.minSamples:
+            return
+        predicted = self.model.predict(self._features(children))
+        k = max(1, int(np.ceil(self.fraction*len(children))))
+        best = np.sort(np.argsort(-predicted, kind="stable")[:k])
+        self.algorithm.children = [children[i] for i in best]
+        self._predicted.update((id(children[i]), predicted[i]) for i in best)
+
+    def on_survivor_begin(self):
+        children = self.algorithm.children
+        self._promoted = set(id(x) for x in children)
+        if len(children) == 0:
+            return
+        fitness = fitness_array(children)
+        predicted = [(self._predicted.pop(id(x)), f) for x, f in zip(children, fitness) if id(x) in self._predicted]
+        self._error = np.nan if not predicted else float(np.mean([abs(p - f) for p, f in predicted]))
+        self.model.partial_fit(self._features(children), fitness)
+
+    def surrogate_hit_rate(self, population: List[AbstractGenome]) -> float:
+        if not self._promoted: return np.nan
+        return sum(id(x) in self._promoted for x in population) / len(self._promoted)
+
+    def surrogate_error(self, population: List[AbstractGenome]) -> float:
+        return self._error
@@ -0,0 +1,109 @@
+"""
+Hyperparameter tuning with successive halving
+A configuration is a dict of keyword arguments for a user defined `build(**params) -> Algorithm`
+function, so it can set generator arguments, operator probabilities, selectors and Algorithm arguments
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import tempfile
+from .core import *
+
+__all__ = ["grid", "SuccessiveHalving"]
+
+def grid(param_space: Dict[str, Collection]) -> List[Dict]:
+    """Every combination of the values of param_space"""
+    keys = list(param_space.keys())
+    return [dict(zip(keys, values)) for values in product(*[param_space[k] for k in keys])]
+
+def _run_config(build: Callable, params: Dict, generations: int, seed: int, file_name: PathOrStr,
+                resume: bool) -> Tuple[float, float]:
+    """Runs one configuration, starting from the population saved in file_name if resume,
+    and saves its last population there. Returns the best fitness and the elapsed time.
+    build evaluates a new population that a resumed run throws away, so the time of a resumed run
+    starts once it is seeded. The random state of the process is restored afterwards
+    """
+    state = random.get_state()
+    random.seed(seed)
+    try:
+        start = time.perf_counter()
+        algorithm = build(**params)
+        if resume:
+            algorithm.seed(algorithm.load_population(file_name, reevaluate=False))
+            start = time.perf_counter()
+        best = algorithm.run(generations)
+        algorithm.save_population(file_name)
+        return float(best.fitness), time.perf_counter() - start
+    finally:
+        random.set_state(state)
+
+class SuccessiveHalving:
+    """Runs every configuration for min_generations, keeps the best 1/eta of them
+    and runs the survivors for eta times more generations, until max_generations or one is left.
+    Runs of a rung are executed in a process pool. The survivors resume from the population
+    they ended the previous rung with (see Algorithm.save_population), so a rung only runs
+    the generations the previous one did not. The fitness of a row is the best one so far
+    and its time is the time of the rung, without the population build discards when it resumes
+    @param build Picklable (top level) function build(**params) -> Algorithm
+    @param param_space Dict of parameter name -> list of values, every combination is tried
+    @param n_configs If set, only this many random combinations are tried
+    @param workers Processes of the pool, 1 runs everything in this process
+    @param seed Seed of the configuration sampling and of the runs (offset by the rung)
+    """
+    def __init__(self, build: Callable, param_space: Dict[str, Collection], min_generations: int = 5,
+                 max_generations: int = 100, eta: int = 3, n_configs: int = None,
+                 workers: int = None, seed: int = 0):
+        self.build = build
+        self.configs = grid(param_space)
+        if n_configs is not None and n_configs < len(self.configs):
+            idx = np.random.RandomState(seed).choice(len(self.configs), size=n_configs, replace=False)
+            self.configs = [self.configs[i] for i in sorted(idx)]
+        self.minGenerations = min_generations
+        self.maxGenerations = max_generations
+        self.eta = eta
+        self.workers = ifnone(workers, num_cpus())
+        self.seed = seed
+        self.results = []
+
+    def _run_rung(self, candidates: List[int], generations: int, done: Dict[int, int],
+                  folder: Path, rung: int) -> List[Tuple[float, float]]:
+        args = [(self.build, self.configs[i], generations - done.get(i, 0), self.seed + rung,
+                 folder/f"config_{i}.npz", i in done) for i in candidates]
+        if self.workers == 1:
+            return [_run_config(*a) for a in args]
+        with ProcessPoolExecutor(self.workers) as executor:
+            return list(executor.map(_run_config, *zip(*args)))
+
+    def run(self) -> List[Dict]:
+        """Races the configurations and returns the results table,
+        one row per configuration and rung, best configurations of the last rung first
+        """
+        self.results = []
+        candidates, generations, rung = list(range(len(self.configs))), self.minGenerations, 0
+        # Generations run and best fitness of every configuration so far
+        done, best = dict(), dict()
+        with tempfile.TemporaryDirectory() as folder:
+            while True:
+                scores = self._run_rung(candidates, generations, done, Path(folder), rung)
+                for i, (fitness, elapsed) in zip(candidates, scores):
+                    done[i], best[i] = generations, max(fitness, best.get(i, -np.inf))
+                    self.results.append(dict(self.configs[i], config=i, rung=rung, generations=generations,
+                                             fitness=best[i], time=elapsed))
+                if len(candidates) <= 1 or generations >= self.maxGenerations:
+                    break
+                order = np.argsort([-best[i] for i in candidates], kind="stable")
+                candidates = [candidates[j] for j in order[:max(1, len(candidates)//self.eta)]]
+                generations, rung = min(self.maxGenerations, generations*self.eta), rung + 1
+        self.results.sort(key=lambda r: (-r["rung"], -r["fitness"]))
+        return self.results
+
+    @property
+    def best(self) -> Dict:
+        """Parameters of the best configuration of the last rung"""
+        return self.configs[self.results[0]["config"]]
+
+    def to_csv(self, file_name: PathOrStr):
+        fieldnames = list(self.results[0].keys())
+        with open(file_name, 'w', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(self.results)
@@ -49,3 +49,73 @@ def traveling_salesman_objective(val: Permutation, data):
     for it, x in enumerate(val[:-1]):
         res += data[x][val[it+1]]
     return res + data[val[-1]][val[0]]
+
+class PointArchive:
+    """ Growable archive of points (rows) with optional targets and k nearest neighbour queries
+    Rows are kept in buffers that double when full. Queries are compared against blocks of
+    the archive keeping a running top k, so memory stays at (queries, block_size + k)
+    whatever the archive size
+    @param max_size If set, the oldest rows are dropped once the archive is full
+    @param block_size Archive rows compared per block
+    """
+    def __init__(self, max_size: int = None, block_size: int = 4096):
+        self.maxSize = max_size
+        self.blockSize = block_size
+        self._X, self._sq, self._y, self._n = None, None, None, 0
+
+    def __len__(self):
+        return self._n
+
+    def reset(self):
+        """Forgets every row"""
+        self._n = 0
+        return self
+
+    @property
+    def points(self) -> np.ndarray:
+        return self._X[:self._n] if self._X is not None else np.empty((0, 0))
+
+    @property
+    def targets(self) -> np.ndarray:
+        return self._y[:self._n] if self._y is not None else np.empty(0)
+
+    def add(self, X: np.ndarray, y: np.ndarray = None):
+        """Appends the rows X (n, features) with their targets y (n,), if any"""
+        X = np.asarray(X, dtype=float)
+        if len(X) == 0: return self
+        if self._X is None:
+            capacity = max(16, len(X))
+            self._X, self._sq, self._y = np.empty((capacity, X.shape[1])), np.empty(capacity), np.empty(capacity)
+        if self._n + len(X) > len(self._X):
+            capacity = max(2*len(self._X), self._n + len(X))
+            self._X = np.resize(self._X[:self._n], (capacity, X.shape[1]))
+            self._sq, self._y = np.resize(self._sq[:self._n], capacity), np.resize(self._y[:self._n], capacity)
+        rows = slice(self._n, self._n + len(X))
+        self._X[rows], self._sq[rows] = X, np.einsum('ij,ij->i', X, X)
+        if y is not None: self._y[rows] = y
+        self._n += len(X)
+        if self.maxSize is not None and self._n > self.maxSize:
+            drop = self._n - self.maxSize
+            for A in (self._X, self._sq, self._y): A[:self.maxSize] = A[drop:self._n]
+            self._n = self.maxSize
+        return self
+
+    def kneighbors(self, Q: np.ndarray, k: int, exclude_self: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Squared distances and indexes (queries, k) of the k nearest rows to every row of Q,
+        padded with inf and -1 when the archive has fewer than k rows
+        @param exclude_self Q are the rows of the archive, a row is not its own neighbour
+        """
+        Q = np.asarray(Q, dtype=float)
+        sq = np.einsum('ij,ij->i', Q, Q)
+        dist, idx = np.full((len(Q), k), np.inf), np.full((len(Q), k), -1)
+        for start in range(0, self._n, self.blockSize):
+            stop = min(start + self.blockSize, self._n)
+            D = sq[:, None] + self._sq[None, start:stop] - 2*(Q @ self._X[start:stop].T)
+            if exclude_self:
+                rows = np.arange(start, min(stop, len(Q)))
+                D[rows, rows - start] = np.inf
+            D = np.concatenate((dist, D), axis=1)
+            I = np.concatenate((idx, np.broadcast_to(np.arange(start, stop), (len(Q), stop - start))), axis=1)
+            top = np.argpartition(D, k-1, axis=1)[:, :k]
+            dist, idx = np.take_along_axis(D, top, axis=1), np.take_along_axis(I, top, axis=1)
+        return np.maximum(dist, 0), idx
@@ -7,8 +7,10 @@ There are two types of validators:
 """
 
 from .core import *
+import Genomikon.core as core
 
-__all__ = ["GenValidationError", "is_permutation", "bounds_validator"]
+__all__ = ["GenValidationError", "is_permutation", "is_permutation_batch", "ValidationPolicy",
+           "set_validation", "get_validation", "check_on_build", "Bounds", "to_bounds", "bounds_validator", "BoundsValidator"]
 
 class GenValidationError(Exception):
     pass
@@ -24,14 +26,82 @@ def is_permutation(val: Permutation):
         raise GenValidationError(f" {val} Not a valid permutation")
     return val
 
-def bounds_validator(val: np.ndarray, bounds: Union[Size, Sizes]):
+def is_permutation_batch(M: np.ndarray) -> np.ndarray:
+    """Returns a boolean mask with the rows of M that are valid permutations,
+        every row is counted with a single bincount over the whole matrix
+    """
+    M = np.asarray(M)
+    r, n = M.shape
+    in_range = np.all((M >= 0) & (M < n), axis=1)
+    offsets = np.where(in_range[:, None], M, 0) + n*np.arange(r)[:, None]
+    counts = np.bincount(offsets.ravel(), minlength=r*n).reshape(r, n)
+    return in_range & np.all(counts == 1, axis=1)
+
+class ValidationPolicy(namedtuple("ValidationPolicy", ["mode", "fraction"])):
+    """When fatal checks (e.g. is_permutation) are run
+        always: every child is checked once per generation, genomes built outside a generation are checked when built
+        sampled: only a random `fraction` of the children is checked once per generation
+        off: no checks
+    """
+    def __new__(cls, mode: str = "always", fraction: float = 0.1):
+        assert mode in ("off", "sampled", "always")
+        return super().__new__(cls, mode, fraction)
+
+_VALIDATION = [ValidationPolicy()]
+
+def set_validation(mode: str = "always", fraction: float = 0.1):
+    """Sets the global validation policy, Algorithm(validation=...) overrides it during its generations"""
+    _VALIDATION[0] = ValidationPolicy(mode, fraction)
+
+def get_validation() -> ValidationPolicy:
+    """Validation policy of the running algorithm, or the global one"""
+    return core.get_context().get("VALIDATION", _VALIDATION[0])
+
+def check_on_build() -> bool:
+    """Whether genomes run their fatal checks when built. Inside a generation the checks
+        are left to the batch check of the children, so they run once per child
+    """
+    return get_validation().mode == "always" and "GENERATION" not in core.get_context()
+
+class Bounds(namedtuple("Bounds", ["lower", "upper"])):
+    """Lower and upper bounds, either scalars or one vector entry per dimension"""
+    pass
+
+def to_bounds(bounds: Union[Size, Sizes, Bounds]) -> Bounds:
+    """Converts a Size, a list of Sizes (one per dimension) or a Bounds into a Bounds"""
+    if isinstance(bounds, Bounds):
+        return Bounds(np.asarray(bounds.lower, dtype=float), np.asarray(bounds.upper, dtype=float))
+    if isinstance(bounds[0], Number):
+        return Bounds(float(bounds[0]), float(bounds[1]))
+    b = np.asarray(bounds, dtype=float)
+    assert b.ndim == 2 and b.shape[1] == 2
+    return Bounds(b[:, 0].copy(), b[:, 1].copy())
+
+def clip(val: np.ndarray, lower: Union[float, np.ndarray], upper: Union[float, np.ndarray]) -> np.ndarray:
+    """np.clip that keeps the dtype of val (float64 bounds do not upcast float32 values)"""
+    val = np.asarray(val)
+    return np.clip(val, lower, upper, out=np.empty_like(val))
+
+def bounds_validator(val: np.ndarray, bounds: Union[Size, Sizes, Bounds]):
     """If bounds is a Size: checks that every element of array is within bounds,
-        If bounds is list of Sizes: checks that every element is on its corresponding bound
+        If bounds is list of Sizes or Bounds of vectors: checks that every element is on its corresponding bound
+        val may be a single value or a population matrix of shape (n, dimensions)
         Non-Fatal
         Clips the elements to the max or min
     """
-    if isinstance(bounds[0], (int, float)):
-            return np.maximum(bounds[0], np.minimum(bounds[1], val))
-    assert len(bounds) == len(val)
-    return np.array([np.maximum(b[0], np.minimum(b[1], val[it])) for it, b in enumerate(bounds)])
-    
+    lower, upper = to_bounds(bounds)
+    assert np.ndim(lower) == 0 or np.shape(lower)[0] == np.shape(val)[-1]
+    return clip(val, lower, upper)
+
+class BoundsValidator:
+    """Same as bounds_validator with the bounds converted once,
+        can validate a whole population matrix in a single call
+        Non-Fatal
+    """
+    batched = True
+    def __init__(self, bounds: Union[Size, Sizes, Bounds]):
+        self.bounds = to_bounds(bounds)
+
+    def __call__(self, val: np.ndarray):
+        return clip(val, *self.bounds)
+
@@ -0,0 +1,32 @@
+#Benchmark: float32 against float64 FloatGenome throughput
+import sys
+import time
+sys.path.append("../")
+import numpy as np
+import Genomikon as gen
+
+## Batched objective, receives the population matrix
+def sphere(M):
+    return -np.einsum('ij,ij->i', M, M)
+
+def throughput(dtype, dims: int, n: int = 200, generations: int = 20):
+    """Returns generations per second"""
+    bounds = gen.Bounds(np.full(dims, -5.0), np.full(dims, 5.0))
+    population = (gen.FloatGenome.generator(dims, bounds, dtype=dtype)
+           .evaluate(lambda x: -float(np.dot(x, x)))
+           .evaluate_batch(sphere)
+           .cross(gen.FloatSimulatedBinaryCross(0.9))
+           .mutate(gen.OneFifthGaussianMutator(0.5))
+           .validate(gen.BoundsValidator(bounds))
+           .population(n))
+    AG = gen.Algorithm(population, gen.TournamentSelector(n, 2), gen.MergeGenerationSelector(n),
+                       callbacks=[gen.OperatorCredit])
+    start = time.perf_counter()
+    AG.run(generations)
+    assert AG.population[0].value.dtype == dtype
+    return generations / (time.perf_counter() - start)
+
+for dims in [100, 10_000, 100_000]:
+    f64 = throughput(np.float64, dims)
+    f32 = throughput(np.float32, dims)
+    print(f"dims={dims:>7}  float64: {f64:8.2f} gen/s  float32: {f32:8.2f} gen/s  speedup: {f32/f64:.2f}x")
@@ -0,0 +1,24 @@
+import numpy as np
+import Genomikon as gen
+
+def sphere(x): return -float(np.sum(x**2))
+
+class SizeSpy(gen.BaseCallback):
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.sizes = []
+
+    def on_run_begin(self):
+        AG = self.algorithm
+        self.sizes.append((AG.offspring, AG.mu, len(AG._weights)))
+
+def test_cmaes_grows_with_ipop_restarts():
+    population = (gen.FloatGenome.generator(4, [-5, 5])
+                  .evaluate(sphere)
+                  .cross(gen.FloatMiddleCross(1.0))
+                  .mutate(gen.FloatUniformMutator(0.3, -5, 5))
+                  .population(8))
+    AG = gen.CMAES(population, mu=2, callbacks=[SizeSpy])
+    AG.simulate(5, 3, gen.IPOPRestart())
+    assert AG.get_callback(SizeSpy).sizes == [(8, 2, 2), (16, 4, 4), (32, 8, 8)]
+    assert len(AG.population) == 32
@@ -0,0 +1,27 @@
+from functools import partial
+import numpy as np
+import Genomikon as gen
+
+def sphere(x): return -float(np.sum(x**2))
+
+def make_algorithm(path, append):
+    population = (gen.FloatGenome.generator(3, [-5, 5])
+                  .evaluate(sphere)
+                  .cross(gen.FloatMiddleCross(1.0))
+                  .mutate(gen.FloatUniformMutator(0.3, -5, 5))
+                  .population(10))
+    return gen.Algorithm(population, gen.TournamentSelector(10, 3), gen.MergeGenerationSelector(10),
+                         callbacks=[partial(gen.HistoryRecorder, path=path, append=append)])
+
+def test_runs_overwrite_the_history_by_default(tmp_path):
+    make_algorithm(tmp_path, False).simulate(4, iterations=2)
+    history = gen.History(tmp_path)
+    assert len(history) == 5 and list(history.runs) == [0]
+
+def test_runs_append_to_the_history(tmp_path):
+    AG = make_algorithm(tmp_path, True)
+    AG.simulate(4, iterations=2)
+    history = gen.History(tmp_path)
+    assert len(history) == 10 and list(history.runs) == [0, 5]
+    assert np.allclose(history[-1][1], gen.fitness_array(AG.population))
+    assert len(history.lineage(-1, 0)) == 5
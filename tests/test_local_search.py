@@ -0,0 +1,44 @@
+from functools import partial
+import numpy as np
+import Genomikon as gen
+from Genomikon.utils import traveling_salesman_objective
+
+def sphere(x): return -float(np.sum(x**2))
+
+def test_memetic_search_with_evaluator_without_fidelity():
+    def evaluator(population):
+        for x in population: x.fitness = sphere(x.value)
+    population = (gen.FloatGenome.generator(3, [-5, 5])
+                  .evaluate(sphere)
+                  .cross(gen.FloatMiddleCross(0.9))
+                  .mutate(gen.FloatUniformMutator(0.3, -5, 5))
+                  .population(10))
+    AG = gen.Algorithm(population, gen.TournamentSelector(10, 3), gen.MergeGenerationSelector(10),
+                       evaluator=evaluator,
+                       callbacks=[partial(gen.MemeticSearch, search=gen.CoordinateSearch(), top_k=2, budget=20)])
+    AG.run(3)
+    assert AG.metrics_record[-1]["local_search_evaluations"] > 0
+
+def test_two_opt_rejects_asymmetric_distances():
+    D = np.array([[0, 1, 2], [3, 0, 1], [2, 1, 0]])
+    try:
+        gen.TwoOptSearch(D)
+    except AssertionError:
+        return
+    raise AssertionError("An asymmetric matrix was accepted")
+
+def test_memetic_search_scores_estimated_improvements():
+    rng = np.random.default_rng(0)
+    P = rng.uniform(0, 10, (12, 2))
+    D = np.linalg.norm(P[:, None] - P[None], axis=-1)
+    # The start penalty is invisible to the distance deltas of the search
+    objective = lambda x: -traveling_salesman_objective(x, D) - 5.0*x[1]
+    population = (gen.PermutationGenome.generator(12)
+                  .evaluate(objective)
+                  .cross(gen.PermutationOrderCross(0.9))
+                  .mutate(gen.PermutationInsertMutator(0.3))
+                  .population(10))
+    AG = gen.Algorithm(population, gen.TournamentSelector(10, 3), gen.MergeGenerationSelector(10),
+                       callbacks=[partial(gen.MemeticSearch, search=gen.TwoOptSearch(D), top_k=3, budget=300)])
+    AG.run(5)
+    assert all(np.isclose(x.fitness, objective(x.value)) for x in AG.population)
@@ -0,0 +1,12 @@
+import Genomikon as gen
+
+def test_edge_diversity_of_short_permutations_is_zero():
+    for L in (1, 2):
+        population = [gen.PermutationGenome(list(range(L))), gen.PermutationGenome(list(range(L))[::-1])]
+        assert gen.permutation_edge_diversity(population) == 0.0
+
+def test_edge_diversity_ignores_rotation_and_direction():
+    population = [gen.PermutationGenome([0, 1, 2, 3]), gen.PermutationGenome([2, 1, 0, 3]),
+                  gen.PermutationGenome([0, 2, 1, 3])]
+    # The first two tours are the same, the third shares half of their edges
+    assert abs(gen.permutation_edge_diversity(population) - (0 + 0.5 + 0.5)/3) < 1e-12
@@ -0,0 +1,25 @@
+from functools import partial
+import numpy as np
+import Genomikon as gen
+
+def shifted_sphere(x): return -100*float(np.sum((x - 3)**2))
+
+def test_best_keeps_the_objective_across_restarts():
+    population = (gen.FloatGenome.generator(4, [-10, 10])
+                  .evaluate(shifted_sphere)
+                  .cross(gen.FloatMiddleCross(0.9))
+                  .mutate(gen.FloatUniformMutator(0.3, -10, 10))
+                  .population(20))
+    AG = gen.Algorithm(population, gen.TournamentSelector(20, 3), gen.MergeGenerationSelector(20),
+                       callbacks=[partial(gen.NoveltySearch, behavior=lambda v: v)])
+    AG.simulate(5, 3, gen.HallOfFameRestart(5))
+    best = AG.get_callback(gen.NoveltySearch).best
+    assert np.isclose(best.objective, shifted_sphere(best.value))
+
+def test_novelty_matches_brute_force():
+    rng = np.random.default_rng(0)
+    A, B = rng.normal(size=(50, 3)), rng.normal(size=(20, 3))
+    archive = gen.NoveltyArchive(k=5, block_size=16).add(A)
+    D = np.sqrt(((B[:, None] - np.concatenate((A, B))[None])**2).sum(-1))
+    D[np.arange(len(B)), len(A) + np.arange(len(B))] = np.inf
+    assert np.allclose(archive.novelty(B), np.sort(D, axis=1)[:, :5].mean(axis=1))
@@ -0,0 +1,34 @@
+import numpy as np
+import Genomikon as gen
+from Genomikon.utils import traveling_salesman_objective
+
+def sphere(x): return -float(np.sum(x**2))
+
+def test_one_fifth_sigma_adapts_with_pairwise_cross():
+    mutator = gen.OneFifthGaussianMutator(1.0, sigma=0.5)
+    population = (gen.FloatGenome.generator(5, [-5, 5])
+                  .evaluate(sphere)
+                  .cross(gen.FloatMiddleCross(1.0))
+                  .mutate(mutator)
+                  .population(20))
+    AG = gen.Algorithm(population, gen.TournamentSelector(20, 3), gen.MergeGenerationSelector(20),
+                       callbacks=[gen.OperatorCredit])
+    AG.run(10)
+    assert mutator.sigma != 0.5
+
+def test_mutator_portfolio_gets_credit_with_pairwise_cross():
+    data = np.random.default_rng(0).integers(1, 30, size=(8, 8))
+    portfolio = gen.MutatorPortfolio([gen.PermutationSwapMutator(1.0), gen.PermutationInsertMutator(1.0)])
+    records = []
+    record = portfolio.record
+    portfolio.record = lambda idx, improvement: (records.append(idx), record(idx, improvement))
+    population = (gen.PermutationGenome.generator(8)
+                  .evaluate(lambda x: -traveling_salesman_objective(x, data))
+                  .cross(gen.PermutationOrderCross(1.0))
+                  .mutate(portfolio)
+                  .population(10))
+    AG = gen.Algorithm(population, gen.TournamentSelector(10, 3), gen.MergeGenerationSelector(10),
+                       callbacks=[gen.OperatorCredit])
+    AG.run(10)
+    assert len(records) == 100
+    assert not np.allclose(portfolio.policy.probabilities, 0.5)
@@ -0,0 +1,14 @@
+import numpy as np
+import Genomikon as gen
+
+def sphere(x): return -float(np.sum(x**2))
+
+def test_ipop_restores_the_selector_sizes():
+    population = (gen.FloatGenome.generator(4, [-5, 5])
+                  .evaluate(sphere)
+                  .cross(gen.FloatMiddleCross(1.0))
+                  .mutate(gen.FloatUniformMutator(0.3, -5, 5))
+                  .population(8))
+    AG = gen.Algorithm(population, gen.TournamentSelector(8, 3), gen.MergeGenerationSelector(8))
+    AG.simulate(3, 3, gen.IPOPRestart())
+    assert AG.parentSelector._size == 8 and AG.survivorSelector._size == 8
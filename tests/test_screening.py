@@ -0,0 +1,43 @@
+import numpy as np
+import Genomikon as gen
+
+def sphere(x, fidelity=None): return -float(np.sum(x**2)) * (1 if fidelity is None else 2)
+
+def make_algorithm():
+    population = (gen.FloatGenome.generator(2, [-5, 5])
+                  .evaluate(sphere)
+                  .cross(gen.FloatMiddleCross(1.0))
+                  .mutate(gen.FloatUniformMutator(0.3, -5, 5))
+                  .population(10))
+    return gen.Algorithm(population, gen.TournamentSelector(10, 3), gen.MergeGenerationSelector(10))
+
+def test_surrogate_error_pairs_predictions_with_their_children():
+    AG = make_algorithm()
+    screening = gen.SurrogateScreening(AG, fraction=1.0, min_samples=1)
+    screening.on_run_begin()
+    AG.children = AG.__genome_type__.from_matrix(np.array([[0., 0.], [3., 0.], [0., 4.]]))
+    screening.on_evaluation_begin()
+    predicted = screening.model.predict(np.stack([x.value for x in AG.children]))
+    # Children come back in another order, and the first one arrives in a later generation
+    first, *rest = AG.children
+    AG.children = rest[::-1]
+    AG.evaluator(AG.children)
+    screening.on_survivor_begin()
+    expected = np.mean(np.abs(predicted[1:] - gen.fitness_array(rest)))
+    assert np.isclose(screening.surrogate_error(AG.population), expected)
+    AG.children = [first]
+    AG.evaluator(AG.children)
+    screening.on_survivor_begin()
+    assert np.isclose(screening.surrogate_error(AG.population), abs(predicted[0] - first.fitness))
+
+def test_fidelity_correlation_pairs_low_and_full_fitness_by_genome():
+    AG = make_algorithm()
+    screening = gen.MultiFidelityScreening(AG, fidelity=0.5, fraction=1.0)
+    screening.on_run_begin()
+    AG.children = AG.__genome_type__.from_matrix(np.array([[0., 0.], [1., 0.], [2., 0.], [3., 0.]]))
+    screening.on_evaluation_begin()
+    AG.children = AG.children[::-1]
+    AG.evaluator(AG.children)
+    screening.on_survivor_begin()
+    # Low and full fidelity rank the children the same way
+    assert np.isclose(screening.fidelity_rank_correlation(AG.population), 1.0)
@@ -0,0 +1,43 @@
+from collections import Counter
+from functools import partial
+import numpy as np
+import Genomikon as gen
+
+def sphere(x): return -float(np.sum(x**2))
+
+HOOKS = ["on_generation_begin", "on_selection_begin", "on_crossover_begin", "on_mutation_begin",
+         "on_evaluation_begin", "on_survivor_begin", "on_generation_end"]
+
+class HookCounter(gen.BaseCallback):
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+        self.calls = Counter()
+        for hook in HOOKS: setattr(self, hook, partial(self.calls.update, [hook]))
+
+def test_hooks_fire_once_per_window():
+    population = (gen.FloatGenome.generator(3, [-5, 5])
+                  .evaluate(sphere)
+                  .cross(gen.FloatMiddleCross(1.0))
+                  .mutate(gen.FloatUniformMutator(0.3, -5, 5))
+                  .population(20))
+    AG = gen.SteadyStateAlgorithm(population, gen.TournamentSelector(20, 3), callbacks=[HookCounter],
+                                  workers=4, report_every=10)
+    AG.run(95)
+    calls = AG.get_callback(HookCounter).calls
+    assert all(calls[hook] == 10 for hook in HOOKS)
+    assert len(AG.population) == 20
+
+def test_steady_state_uses_the_evaluator():
+    evaluated = []
+    def evaluator(population):
+        evaluated.extend(population)
+        for x in population: x.fitness = sphere(x.value)
+    population = (gen.FloatGenome.generator(3, [-5, 5])
+                  .evaluate(sphere)
+                  .cross(gen.FloatMiddleCross(1.0))
+                  .mutate(gen.FloatUniformMutator(0.3, -5, 5))
+                  .population(10))
+    AG = gen.SteadyStateAlgorithm(population, gen.TournamentSelector(10, 3), evaluator=evaluator,
+                                  workers=2, report_every=10)
+    AG.run(30)
+    assert len(evaluated) == 10 + 30
@@ -0,0 +1,33 @@
+import numpy as np
+import Genomikon as gen
+
+GENERATIONS = []
+
+class CountGenerations(gen.BaseCallback):
+    def on_generation_end(self): GENERATIONS.append(1)
+
+def build(prob: float):
+    population = (gen.FloatGenome.generator(3, [-5, 5])
+                  .evaluate(lambda x: -float(np.sum(x**2)))
+                  .cross(gen.FloatMiddleCross(0.9))
+                  .mutate(gen.FloatUniformMutator(prob, -5, 5))
+                  .population(10))
+    return gen.Algorithm(population, gen.TournamentSelector(10, 3), gen.MergeGenerationSelector(10),
+                         callbacks=[CountGenerations])
+
+def test_successive_halving_resumes_survivors():
+    GENERATIONS.clear()
+    sweep = gen.SuccessiveHalving(build, dict(prob=[0.1, 0.3, 0.5]), min_generations=2,
+                                  max_generations=6, eta=3, workers=1)
+    results = sweep.run()
+    # 3 configs run 2 generations, the survivor resumes for the 4 extra ones
+    assert len(GENERATIONS) == 3*2 + 4
+    assert results[0]["generations"] == 6
+    assert results[0]["fitness"] >= max(r["fitness"] for r in results if r["config"] == results[0]["config"])
+
+def test_successive_halving_keeps_the_random_state():
+    np.random.seed(123)
+    expected = np.random.random()
+    np.random.seed(123)
+    gen.SuccessiveHalving(build, dict(prob=[0.1, 0.3]), min_generations=1, max_generations=3, workers=1).run()
+    assert np.random.random() == expected
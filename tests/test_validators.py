@@ -0,0 +1,15 @@
+import pytest
+import Genomikon as gen
+
+def test_check_batch_rejects_child_of_wrong_length():
+    population = [gen.PermutationGenome([0, 1, 2, 3]), gen.PermutationGenome([3, 2, 1, 0])]
+    gen.set_validation("off")
+    try:
+        population.append(gen.PermutationGenome([0, 1, 3]))
+    finally:
+        gen.set_validation("always")
+    with pytest.raises(gen.GenValidationError):
+        gen.PermutationGenome.check_batch(population)
+
+def test_check_batch_accepts_permutations():
+    gen.PermutationGenome.check_batch([gen.PermutationGenome([0, 1, 2]), gen.PermutationGenome([2, 0, 1])])